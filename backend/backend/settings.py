@@ -146,3 +146,15 @@ DATABASES = {
         "PORT": "3306",
     },
 }
+
+# Optional read replicas of the student DB, given as a comma-separated list of
+# hosts in STUDENT_DB_REPLICA_HOSTS. Each becomes a "student_replica_<n>" alias
+# with the same credentials as "student"; see hackathon/replicas.py.
+STUDENT_REPLICA_ALIASES = []
+for _index, _host in enumerate(
+    [h.strip() for h in (os.getenv("STUDENT_DB_REPLICA_HOSTS") or "").split(",") if h.strip()],
+    start=1,
+):
+    _alias = f"student_replica_{_index}"
+    DATABASES[_alias] = {**DATABASES["student"], "HOST": _host, "TEST": {"MIRROR": "student"}}
+    STUDENT_REPLICA_ALIASES.append(_alias)
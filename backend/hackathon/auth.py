@@ -4,18 +4,27 @@ import hmac
 import json
 import os
 import secrets
-import urllib.error
-import urllib.parse
-import urllib.request
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+from django.conf import settings
 from django.utils import timezone
 
+from .otp_gateway import OtpGatewayError, otp_gateway
+
 
 SESSION_COOKIE_NAME = 'app_session'
 PBKDF2_ITERATIONS = 260000
 SESSION_TTL = timedelta(days=7)
+# 'opaque' tokens are looked up in AuthSession on every request; 'signed'
+# tokens carry their own HMAC-signed claims and are checked without the DB.
+AUTH_TOKEN_MODE = (os.getenv('AUTH_TOKEN_MODE') or 'opaque').strip().lower()
+SIGNED_TOKEN_PREFIX = 'v1.'
+# 'gateway' lets the OTP gateway generate and verify codes; 'local' generates
+# them here, sends them through the gateway for delivery only and verifies
+# them against the hash stored on the challenge.
+OTP_MODE = (os.getenv('OTP_MODE') or 'gateway').strip().lower()
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS') or 5)
 
 
 def _b64encode(raw: bytes) -> str:
@@ -50,6 +59,68 @@ def hash_session_token(token: str) -> str:
     return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 
+@dataclass(frozen=True)
+class SignedSessionClaims:
+    user_id: int
+    member_id: int | None
+    expires_at: timezone.datetime
+
+
+def _signing_key() -> bytes:
+    key = os.getenv('SESSION_SIGNING_KEY') or settings.SECRET_KEY
+    if not key:
+        raise RuntimeError('Missing SESSION_SIGNING_KEY or SECRET_KEY for signed session tokens')
+    return key.encode('utf-8')
+
+
+def _b64url_encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64url_decode(val: str) -> bytes:
+    return base64.urlsafe_b64decode(val + '=' * (-len(val) % 4))
+
+
+def create_signed_session_token(*, user_id: int, member_id: int | None, expires_at: timezone.datetime) -> str:
+    claims = {
+        'uid': user_id,
+        'mid': member_id,
+        'exp': int(expires_at.timestamp()),
+        'jti': secrets.token_urlsafe(12),
+    }
+    body = _b64url_encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    signature = hmac.new(_signing_key(), body.encode('ascii'), hashlib.sha256).digest()
+    return f'{SIGNED_TOKEN_PREFIX}{body}.{_b64url_encode(signature)}'
+
+
+def is_signed_session_token(token: str) -> bool:
+    return token.startswith(SIGNED_TOKEN_PREFIX)
+
+
+def verify_signed_session_token(token: str) -> SignedSessionClaims | None:
+    if not is_signed_session_token(token):
+        return None
+    try:
+        body, signature = token[len(SIGNED_TOKEN_PREFIX):].split('.')
+        expected = hmac.new(_signing_key(), body.encode('ascii'), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        claims = json.loads(_b64url_decode(body))
+        expires_at = datetime.fromtimestamp(int(claims['exp']), tz=dt_timezone.utc)
+        member_id = claims.get('mid')
+        result = SignedSessionClaims(
+            user_id=int(claims['uid']),
+            member_id=int(member_id) if member_id is not None else None,
+            expires_at=expires_at,
+        )
+    except (ValueError, KeyError, TypeError, UnicodeError, OverflowError, OSError):
+        return None
+
+    if result.expires_at <= timezone.now():
+        return None
+    return result
+
+
 @dataclass(frozen=True)
 class SessionTimes:
     created_at: timezone.datetime
@@ -81,9 +152,8 @@ class OtpDispatchError(RuntimeError):
     pass
 
 
-def dispatch_otp(*, channel: str, identifier: str, otp: str | None = None, display_name: str | None = None) -> None:
+def _dispatch_payload(channel: str, identifier: str, otp: str | None) -> dict:
     url = (os.getenv('OTP_GATEWAY_URL') or '').strip()
-    auth_header = (os.getenv('OTP_GATEWAY_AUTH_HEADER') or '').strip()
 
     if not url:
         raise OtpDispatchError('Missing OTP_GATEWAY_URL environment variable')
@@ -97,44 +167,42 @@ def dispatch_otp(*, channel: str, identifier: str, otp: str | None = None, displ
         'type': channel,
         'email_mobile': identifier,
     }
+    if otp is not None:
+        # The code was generated here; the gateway only delivers it.
+        payload['GenerateOTP'] = 'no'
+        payload['otp'] = otp
+    return payload
 
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Accept': 'application/json',
-    }
-    if auth_header:
-        headers['Authorization'] = auth_header
 
-    raw = urllib.parse.urlencode(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=raw, method='POST', headers=headers)
+def _check_dispatch_result(result: dict) -> None:
+    if (result.get('status') or '').strip().lower() != 'success':
+        raise OtpDispatchError('OTP gateway did not return success')
 
+
+def dispatch_otp(*, channel: str, identifier: str, otp: str | None = None, display_name: str | None = None) -> None:
+    payload = _dispatch_payload(channel, identifier, otp)
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            status = getattr(resp, 'status', None) or resp.getcode()
-            if status < 200 or status >= 300:
-                raise OtpDispatchError(f'OTP gateway returned HTTP {status}')
+        result = otp_gateway.post_form(payload)
+    except OtpGatewayError as exc:
+        raise OtpDispatchError(str(exc)) from exc
+    _check_dispatch_result(result)
 
-            body = resp.read().decode('utf-8')
-            try:
-                payload = json.loads(body)
-            except json.JSONDecodeError as exc:
-                raise OtpDispatchError('OTP gateway returned invalid JSON') from exc
 
-            if (payload.get('status') or '').strip().lower() != 'success':
-                raise OtpDispatchError('OTP gateway did not return success')
-    except urllib.error.HTTPError as exc:
-        raise OtpDispatchError(f'OTP gateway returned HTTP {exc.code}') from exc
-    except urllib.error.URLError as exc:
-        raise OtpDispatchError('Unable to reach OTP gateway') from exc
+async def adispatch_otp(*, channel: str, identifier: str, otp: str | None = None, display_name: str | None = None) -> None:
+    payload = _dispatch_payload(channel, identifier, otp)
+    try:
+        result = await otp_gateway.apost_form(payload)
+    except OtpGatewayError as exc:
+        raise OtpDispatchError(str(exc)) from exc
+    _check_dispatch_result(result)
 
 
 class OtpVerifyError(RuntimeError):
     pass
 
 
-def verify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
+def _verify_payload(identifier: str, otp: str) -> dict:
     url = (os.getenv('OTP_GATEWAY_URL') or '').strip()
-    auth_header = (os.getenv('OTP_GATEWAY_AUTH_HEADER') or '').strip()
 
     if not url:
         raise OtpVerifyError('Missing OTP_GATEWAY_URL environment variable')
@@ -143,37 +211,29 @@ def verify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
     if not otp:
         raise OtpVerifyError('Missing OTP value')
 
-    payload = {
+    return {
         'login_verfication': 'yes',
         'email_mobile': identifier,
         'otp': otp,
         'password': '',
     }
 
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Accept': 'application/json',
-    }
-    if auth_header:
-        headers['Authorization'] = auth_header
 
-    raw = urllib.parse.urlencode(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=raw, method='POST', headers=headers)
+def verify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
+    payload = _verify_payload(identifier, otp)
+    # The gateway may consume the code on the first verify, so only requests
+    # that never reached it (connection failures) are retried.
+    try:
+        result = otp_gateway.post_form(payload)
+    except OtpGatewayError as exc:
+        raise OtpVerifyError(str(exc)) from exc
+    return (result.get('status') or '').strip().lower() == 'success'
+
 
+async def averify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
+    payload = _verify_payload(identifier, otp)
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            status = getattr(resp, 'status', None) or resp.getcode()
-            if status < 200 or status >= 300:
-                raise OtpVerifyError(f'OTP gateway returned HTTP {status}')
-
-            body = resp.read().decode('utf-8')
-            try:
-                payload = json.loads(body)
-            except json.JSONDecodeError as exc:
-                raise OtpVerifyError('OTP gateway returned invalid JSON') from exc
-
-            return (payload.get('status') or '').strip().lower() == 'success'
-    except urllib.error.HTTPError as exc:
-        raise OtpVerifyError(f'OTP gateway returned HTTP {exc.code}') from exc
-    except urllib.error.URLError as exc:
-        raise OtpVerifyError('Unable to reach OTP gateway') from exc
+        result = await otp_gateway.apost_form(payload)
+    except OtpGatewayError as exc:
+        raise OtpVerifyError(str(exc)) from exc
+    return (result.get('status') or '').strip().lower() == 'success'
@@ -1,3 +1,6 @@
+from .replicas import replica_selector
+
+
 class HackathonDbRouter:
     CORE_MODEL_NAMES = {
         "appuser",
@@ -13,7 +16,7 @@ class HackathonDbRouter:
         model_name = getattr(model._meta, "model_name", "").lower()
         if model_name in self.CORE_MODEL_NAMES:
             return "default"
-        return "student"
+        return replica_selector.read_alias()
 
     def db_for_write(self, model, **hints):
         if getattr(model._meta, "app_label", None) != "hackathon":
@@ -0,0 +1,382 @@
+import base64
+import json
+import math
+import os
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db import connections, transaction
+from pytz import timezone as pytz_timezone
+
+from .leaderboard import leaderboard
+from .replicas import replica_selector
+
+
+REQUIRED_FIELDS = ("user_id", "total_score", "total_time_spent", "tasks_completed")
+
+# Signed MySQL column limits for user_id (BIGINT) and the INT columns.
+_BIGINT_MAX = 2**63 - 1
+_INT_MAX = 2**31 - 1
+
+INSERT_GAME_RESULT_SQL = """
+    INSERT INTO team19.game_results
+    (user_id, total_score, total_time_spent, tasks_completed, created_at)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Secondary indexes on team19.game_results needed by the read paths, created
+# by ``manage.py game_results_schema``.
+GAME_RESULTS_INDEXES = {
+    "idx_game_results_user_created": "(user_id, created_at, id)",
+}
+
+# Per-user running totals, updated in the same transaction as every insert
+# so reading a user's stats is a primary-key lookup.
+USER_STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS team19.game_user_stats (
+        user_id BIGINT NOT NULL PRIMARY KEY,
+        total_games BIGINT NOT NULL,
+        total_score DOUBLE NOT NULL,
+        best_score DOUBLE NOT NULL,
+        total_time BIGINT NOT NULL,
+        total_tasks BIGINT NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+"""
+
+UPSERT_USER_STATS_SQL = """
+    INSERT INTO team19.game_user_stats
+    (user_id, total_games, total_score, best_score, total_time, total_tasks, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        total_games = total_games + VALUES(total_games),
+        total_score = total_score + VALUES(total_score),
+        best_score = GREATEST(best_score, VALUES(best_score)),
+        total_time = total_time + VALUES(total_time),
+        total_tasks = total_tasks + VALUES(total_tasks),
+        updated_at = VALUES(updated_at)
+"""
+
+# Hourly and daily activity buckets. game_activity_users records which users
+# played in each bucket so distinct_users can be maintained incrementally.
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+ACTIVITY_ROLLUPS_DDL = """
+    CREATE TABLE IF NOT EXISTS team19.game_activity_rollups (
+        granularity VARCHAR(4) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        games BIGINT NOT NULL,
+        total_score DOUBLE NOT NULL,
+        total_time BIGINT NOT NULL,
+        total_tasks BIGINT NOT NULL,
+        distinct_users BIGINT NOT NULL,
+        PRIMARY KEY (granularity, bucket_start)
+    )
+"""
+
+ACTIVITY_USERS_DDL = """
+    CREATE TABLE IF NOT EXISTS team19.game_activity_users (
+        granularity VARCHAR(4) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        user_id BIGINT NOT NULL,
+        PRIMARY KEY (granularity, bucket_start, user_id)
+    )
+"""
+
+INSERT_ACTIVITY_USER_SQL = """
+    INSERT IGNORE INTO team19.game_activity_users
+    (granularity, bucket_start, user_id)
+    VALUES (%s, %s, %s)
+"""
+
+UPSERT_ACTIVITY_ROLLUP_SQL = """
+    INSERT INTO team19.game_activity_rollups
+    (granularity, bucket_start, games, total_score, total_time, total_tasks, distinct_users)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        games = games + VALUES(games),
+        total_score = total_score + VALUES(total_score),
+        total_time = total_time + VALUES(total_time),
+        total_tasks = total_tasks + VALUES(total_tasks),
+        distinct_users = distinct_users + VALUES(distinct_users)
+"""
+
+# Client-supplied idempotency keys of results already written. Kept out of
+# game_results itself so its unique index does not constrain that table.
+# claim_id identifies the transaction that wrote each key.
+RESULT_KEYS_DDL = """
+    CREATE TABLE IF NOT EXISTS team19.game_result_keys (
+        idempotency_key VARCHAR(64) NOT NULL PRIMARY KEY,
+        claim_id CHAR(32) NOT NULL,
+        created_at DATETIME NOT NULL
+    )
+"""
+
+INSERT_RESULT_KEY_SQL = """
+    INSERT IGNORE INTO team19.game_result_keys (idempotency_key, claim_id, created_at)
+    VALUES (%s, %s, %s)
+"""
+
+# Created by ``manage.py game_results_schema``; request paths never run DDL.
+SUMMARY_TABLES_DDL = {
+    "game_user_stats": USER_STATS_DDL,
+    "game_activity_rollups": ACTIVITY_ROLLUPS_DDL,
+    "game_activity_users": ACTIVITY_USERS_DDL,
+    "game_result_keys": RESULT_KEYS_DDL,
+}
+
+RECENT_RESULT_KEYS_LIMIT = int(os.getenv("RECENT_RESULT_KEYS_LIMIT") or 50000)
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+
+
+def india_now() -> datetime:
+    return datetime.now(pytz_timezone("Asia/Kolkata"))
+
+
+@dataclass(frozen=True)
+class GameResult:
+    user_id: int
+    total_score: float
+    total_time_spent: int
+    tasks_completed: int
+    created_at: datetime
+    idempotency_key: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "total_score": self.total_score,
+            "total_time_spent": self.total_time_spent,
+            "tasks_completed": self.tasks_completed,
+        }
+
+    def as_row(self) -> list:
+        return [
+            self.user_id,
+            self.total_score,
+            self.total_time_spent,
+            self.tasks_completed,
+            self.created_at,
+        ]
+
+
+class RecentKeys:
+    """Bounded LRU set of idempotency keys known to be saved or queued.
+
+    A hit lets a retried submission be answered without touching the DB;
+    a miss falls through to the unique key in team19.game_result_keys.
+    """
+
+    def __init__(self, limit: int = RECENT_RESULT_KEYS_LIMIT):
+        self.limit = limit
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def add(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > self.limit:
+                self._keys.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+recent_result_keys = RecentKeys()
+
+
+def clean_idempotency_key(raw) -> str | None:
+    """Normalize a client idempotency key; raises ValueError."""
+    if raw is None:
+        return None
+    key = str(raw).strip()
+    if not key:
+        return None
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH or not key.isprintable():
+        raise ValueError(
+            f"Idempotency key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} printable characters"
+        )
+    return key
+
+
+def missing_fields(data) -> list[str]:
+    # Allow 0 values, just check for None
+    return [name for name in REQUIRED_FIELDS if data.get(name) is None]
+
+
+def _bounded_int(data, name: str, high: int) -> int:
+    value = int(data.get(name))
+    if not -high - 1 <= value <= high:
+        raise ValueError(f"{name} is out of range")
+    return value
+
+
+def parse_result(data, idempotency_key: str | None = None) -> GameResult:
+    """Convert a request payload to a GameResult; raises ValueError.
+
+    Values the game_results columns cannot store (NaN, infinities, integers
+    outside BIGINT/INT) are rejected here rather than by the insert.
+    """
+    total_score = float(data.get("total_score"))
+    if not math.isfinite(total_score):
+        raise ValueError("total_score must be a finite number")
+    return GameResult(
+        user_id=_bounded_int(data, "user_id", _BIGINT_MAX),
+        total_score=total_score,
+        total_time_spent=_bounded_int(data, "total_time_spent", _INT_MAX),
+        tasks_completed=_bounded_int(data, "tasks_completed", _INT_MAX),
+        created_at=india_now(),
+        idempotency_key=idempotency_key,
+    )
+
+
+def encode_page_cursor(created_at: datetime, result_id: int) -> str:
+    raw = json.dumps([created_at.strftime("%Y-%m-%d %H:%M:%S.%f"), result_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_page_cursor(cursor: str) -> tuple[str, int]:
+    """Return (created_at, id) from a page cursor; raises ValueError."""
+    try:
+        created_at, result_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        )
+        return str(created_at), int(result_id)
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _user_stats_rows(results: list[GameResult]) -> list[list]:
+    totals = defaultdict(lambda: [0, 0.0, None, 0, 0])
+    for result in results:
+        entry = totals[result.user_id]
+        entry[0] += 1
+        entry[1] += result.total_score
+        entry[2] = (
+            result.total_score
+            if entry[2] is None
+            else max(entry[2], result.total_score)
+        )
+        entry[3] += result.total_time_spent
+        entry[4] += result.tasks_completed
+
+    updated_at = india_now()
+    return [[user_id, *entry, updated_at] for user_id, entry in totals.items()]
+
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    return created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _update_rollups(cursor, results: list[GameResult]) -> None:
+    buckets = defaultdict(lambda: [0, 0.0, 0, 0, set()])
+    for result in results:
+        for granularity in ROLLUP_GRANULARITIES:
+            entry = buckets[(granularity, bucket_start(result.created_at, granularity))]
+            entry[0] += 1
+            entry[1] += result.total_score
+            entry[2] += result.total_time_spent
+            entry[3] += result.tasks_completed
+            entry[4].add(result.user_id)
+
+    rows = []
+    for (granularity, start), (games, score, time_spent, tasks, users) in buckets.items():
+        # rowcount counts only users not yet seen in this bucket.
+        cursor.executemany(
+            INSERT_ACTIVITY_USER_SQL,
+            [[granularity, start, user_id] for user_id in users],
+        )
+        new_users = max(cursor.rowcount, 0)
+        rows.append([granularity, start, games, score, time_spent, tasks, new_users])
+    cursor.executemany(UPSERT_ACTIVITY_ROLLUP_SQL, rows)
+
+
+def _claim_keys(cursor, results: list[GameResult]) -> list[GameResult]:
+    """Drop results whose idempotency key has already been written.
+
+    All keys are claimed with one multi-row INSERT IGNORE tagged with a
+    fresh claim id, then one primary-key SELECT reads back which of them
+    this transaction wrote. Claiming a key takes its row lock, so a
+    concurrent submission of the same key waits for this transaction and
+    then sees it as a duplicate.
+    """
+    keys = list(
+        dict.fromkeys(r.idempotency_key for r in results if r.idempotency_key)
+    )
+    if not keys:
+        return results
+
+    claim_id = uuid.uuid4().hex
+    created_at = results[0].created_at
+    cursor.executemany(
+        INSERT_RESULT_KEY_SQL, [[key, claim_id, created_at] for key in keys]
+    )
+    cursor.execute(
+        f"""
+        SELECT idempotency_key
+        FROM team19.game_result_keys
+        WHERE idempotency_key IN ({", ".join(["%s"] * len(keys))})
+          AND claim_id = %s
+        """,
+        keys + [claim_id],
+    )
+    claimed = {row[0] for row in cursor.fetchall()}
+
+    fresh = []
+    for result in results:
+        if result.idempotency_key is not None:
+            if result.idempotency_key not in claimed:
+                continue
+            # A key repeated within one batch is only inserted once.
+            claimed.discard(result.idempotency_key)
+        fresh.append(result)
+    return fresh
+
+
+def insert_results(results: list[GameResult]) -> list[GameResult]:
+    """Insert results into team19.game_results in a single transaction.
+
+    Results whose idempotency key was already used are skipped; the ones
+    actually inserted are returned. The per-user totals in
+    team19.game_user_stats and the activity rollups are updated in the same
+    transaction; once it commits the in-memory leaderboard is updated and the
+    users are pinned to the primary for reads (read-your-writes).
+    """
+    if not results:
+        return []
+
+    with transaction.atomic(using="student"):
+        with connections["student"].cursor() as cursor:
+            inserted = _claim_keys(cursor, results)
+            if not inserted:
+                return []
+            cursor.executemany(
+                INSERT_GAME_RESULT_SQL, [result.as_row() for result in inserted]
+            )
+            cursor.executemany(UPSERT_USER_STATS_SQL, _user_stats_rows(inserted))
+            _update_rollups(cursor, inserted)
+        transaction.on_commit(lambda: leaderboard.record(inserted), using="student")
+        transaction.on_commit(
+            lambda: replica_selector.note_writes({r.user_id for r in inserted}),
+            using="student",
+        )
+
+    recent_result_keys.add(
+        result.idempotency_key for result in results if result.idempotency_key
+    )
+    return inserted
@@ -0,0 +1,216 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import (
+    DataError,
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+    connections,
+)
+
+from .game_results import GameResult, insert_results, recent_result_keys
+
+
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+GAME_RESULTS_WRITE_BEHIND = _env_flag("GAME_RESULTS_WRITE_BEHIND")
+GAME_RESULTS_QUEUE_LIMIT = int(os.getenv("GAME_RESULTS_QUEUE_LIMIT") or 10000)
+GAME_RESULTS_FLUSH_SIZE = int(os.getenv("GAME_RESULTS_FLUSH_SIZE") or 500)
+GAME_RESULTS_FLUSH_SECONDS = float(os.getenv("GAME_RESULTS_FLUSH_SECONDS") or 1.0)
+
+# MySQL errors after which the same rows can succeed on a later attempt
+# (lost/refused connections, too many connections, lock wait, deadlock).
+_TRANSIENT_MYSQL_ERRORS = {1040, 1205, 1213, 2002, 2003, 2006, 2013}
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, InterfaceError):
+        return True
+    if isinstance(exc, OperationalError):
+        code = exc.args[0] if exc.args else None
+        return code in _TRANSIENT_MYSQL_ERRORS or not isinstance(code, int)
+    return False
+
+
+class WriteBehindBuffer:
+    """In-process queue of game results flushed to the DB in batches.
+
+    A background thread writes the queue with one ``executemany`` per batch
+    whenever ``flush_size`` results are waiting or ``flush_seconds`` have
+    passed. The queue is bounded: ``enqueue`` returns False when it is full
+    and the caller is expected to write synchronously instead. Whatever is
+    still queued is flushed at interpreter shutdown.
+
+    A batch that fails on a connection problem is put back and retried. On
+    any other failure the batch is retried row by row and rows the database
+    rejects are logged and dropped, so one bad row cannot block the queue.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = GAME_RESULTS_QUEUE_LIMIT,
+        flush_size: int = GAME_RESULTS_FLUSH_SIZE,
+        flush_seconds: float = GAME_RESULTS_FLUSH_SECONDS,
+    ):
+        self.max_queue = max_queue
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self._queue: deque[GameResult] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+        self._enqueued = 0
+        self._flushed = 0
+        self._rejected = 0
+        self._failed_flushes = 0
+        self._dead_lettered = 0
+        self._flushes = 0
+        self._flush_ms_total = 0.0
+        self._flush_ms_max = 0.0
+        self._last_flush_ms = 0.0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="game-results-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    def enqueue(self, result: GameResult) -> bool:
+        with self._cond:
+            if self._closed or len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                return False
+            self._ensure_thread()
+            self._queue.append(result)
+            self._enqueued += 1
+            if len(self._queue) >= self.flush_size:
+                self._cond.notify()
+        return True
+
+    def _take_batch(self) -> list[GameResult]:
+        with self._cond:
+            if len(self._queue) < self.flush_size and not self._closed:
+                self._cond.wait(self.flush_seconds)
+            count = min(len(self._queue), self.flush_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: list[GameResult]) -> None:
+        with self._cond:
+            room = self.max_queue - len(self._queue)
+            if room < len(batch):
+                print(f"Dropping {len(batch) - room} buffered game results")
+            self._queue.extendleft(reversed(batch[:room]))
+
+    def _write(self, batch: list[GameResult]) -> Exception | None:
+        started = time.monotonic()
+        try:
+            insert_results(batch)
+        except Exception as e:
+            with self._cond:
+                self._failed_flushes += 1
+            return e
+        finally:
+            connections["student"].close_if_unusable_or_obsolete()
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._cond:
+            self._flushed += len(batch)
+            self._flushes += 1
+            self._flush_ms_total += elapsed_ms
+            self._flush_ms_max = max(self._flush_ms_max, elapsed_ms)
+            self._last_flush_ms = elapsed_ms
+        return None
+
+    def _dead_letter(self, result: GameResult, error: Exception) -> None:
+        print(
+            f"Dropping game result {json.dumps(result.as_dict())} "
+            f"(key={result.idempotency_key}): {str(error)}"
+        )
+        # The key was recorded when the result was queued; forget it so a
+        # corrected resubmission is not answered as a duplicate.
+        if result.idempotency_key is not None:
+            recent_result_keys.discard(result.idempotency_key)
+        with self._cond:
+            self._dead_lettered += 1
+
+    def flush_batch(self, batch: list[GameResult]) -> list[GameResult]:
+        """Write ``batch``; return the rows to retry later."""
+        error = self._write(batch)
+        if error is None:
+            return []
+        print(f"Error flushing game results: {str(error)}")
+        if _is_transient(error):
+            return batch
+
+        failed = [(batch[0], error)] if len(batch) == 1 else []
+        wrote_any = False
+        for index, result in enumerate(batch if len(batch) > 1 else []):
+            error = self._write([result])
+            if error is None:
+                wrote_any = True
+            elif _is_transient(error):
+                return [row for row, _ in failed] + batch[index:]
+            else:
+                failed.append((result, error))
+
+        # A row is dropped when the database rejected its data, or when other
+        # rows of the batch went in; if every row failed the same way the
+        # problem is not the data (e.g. a missing table) and all are kept.
+        retry = []
+        for result, error in failed:
+            if wrote_any or isinstance(error, (DataError, IntegrityError)):
+                self._dead_letter(result, error)
+            else:
+                retry.append(result)
+        return retry
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            retry = self.flush_batch(batch) if batch else []
+            if retry:
+                self._requeue(retry)
+                time.sleep(self.flush_seconds)
+            with self._cond:
+                if self._closed and not self._queue:
+                    return
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "enabled": GAME_RESULTS_WRITE_BEHIND,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "enqueued": self._enqueued,
+                "flushed": self._flushed,
+                "rejected": self._rejected,
+                "flushes": self._flushes,
+                "failed_flushes": self._failed_flushes,
+                "dead_lettered": self._dead_lettered,
+                "last_flush_ms": round(self._last_flush_ms, 2),
+                "avg_flush_ms": round(self._flush_ms_total / self._flushes, 2)
+                if self._flushes
+                else 0.0,
+                "max_flush_ms": round(self._flush_ms_max, 2),
+            }
+
+
+game_results_buffer = WriteBehindBuffer()
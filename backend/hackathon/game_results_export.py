@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import os
+import threading
+import zlib
+
+import MySQLdb
+from django.db import DatabaseError, connections
+from MySQLdb.cursors import SSCursor
+
+from .replicas import replica_selector
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "total_score",
+    "total_time_spent",
+    "tasks_completed",
+    "created_at",
+)
+EXPORT_CHUNK_ROWS = 1000
+# Each running export holds a dedicated DB connection for its whole stream.
+GAME_RESULTS_EXPORT_CONCURRENCY = int(os.getenv("GAME_RESULTS_EXPORT_CONCURRENCY") or 2)
+
+_export_slots = threading.BoundedSemaphore(GAME_RESULTS_EXPORT_CONCURRENCY)
+
+
+class ExportBusy(RuntimeError):
+    pass
+
+
+def _open_cursor(alias: str):
+    connection = connections.create_connection(alias)
+    try:
+        connection.ensure_connection()
+        cursor = connection.connection.cursor(SSCursor)
+        cursor.execute(
+            f"""
+            SELECT {", ".join(EXPORT_COLUMNS)}
+            FROM team19.game_results
+            ORDER BY id
+            """
+        )
+    except BaseException:
+        connection.close()
+        raise
+    return connection, cursor
+
+
+def iter_game_results(chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yield lists of team19.game_results rows without buffering the table.
+
+    Rows are read through an unbuffered server-side cursor on a dedicated
+    connection (to a replica when one is configured, falling back to the
+    primary if it cannot be queried), so memory use depends on
+    ``chunk_rows`` only.
+    """
+    alias = replica_selector.read_alias()
+    try:
+        connection, cursor = _open_cursor(alias)
+    except (DatabaseError, MySQLdb.Error):
+        if alias == replica_selector.primary:
+            raise
+        replica_selector.mark_down(alias)
+        connection, cursor = _open_cursor(replica_selector.primary)
+
+    try:
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+
+def _ndjson_chunks(chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(fmt: str = "ndjson", gzip: bool = False):
+    """Yield the export of team19.game_results as bytes chunks."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    chunks = iter_game_results()
+    body = _ndjson_chunks(chunks) if fmt == "ndjson" else _csv_chunks(chunks)
+    return _gzip_chunks(body) if gzip else body
+
+
+class ExportStream:
+    """An export that holds one of the export slots until closed.
+
+    StreamingHttpResponse calls ``close`` when the response ends, including
+    when the client goes away before the stream is read.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._chunks.close()
+        finally:
+            _export_slots.release()
+
+
+def open_export(fmt: str = "ndjson", gzip: bool = False) -> ExportStream:
+    """Start an export, or raise ExportBusy when too many are running."""
+    if not _export_slots.acquire(blocking=False):
+        raise ExportBusy("Too many exports running, try again later")
+    try:
+        return ExportStream(iter_export(fmt, gzip=gzip))
+    except BaseException:
+        _export_slots.release()
+        raise
@@ -0,0 +1,119 @@
+import bisect
+import os
+import threading
+import time
+
+from django.db import connections
+
+from .replicas import replica_selector
+
+
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS") or 60)
+
+
+class Leaderboard:
+    """Users ranked by total score, kept in a sorted list.
+
+    ``record`` applies score deltas from this process as results are
+    committed; a periodic rebuild from team19.game_user_stats picks up writes
+    made by other workers and restores the board after a restart. Ties are
+    broken by user id so every user has a distinct rank.
+    """
+
+    def __init__(self, refresh_seconds: int = LEADERBOARD_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._stats: dict[int, tuple[float, float, int]] = {}
+        self._order: list[tuple[float, int]] = []
+        self._loaded_at = 0.0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(user_id: int, total_score: float) -> tuple[float, int]:
+        return (-total_score, user_id)
+
+    @staticmethod
+    def _fetch_stats(alias: str) -> list[tuple]:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT user_id, total_score, best_score, total_games
+                FROM team19.game_user_stats
+                """
+            )
+            return cursor.fetchall()
+
+    def rebuild(self) -> None:
+        rows = replica_selector.run_read(self._fetch_stats)
+
+        stats = {
+            int(user_id): (float(total_score), float(best_score), int(total_games))
+            for user_id, total_score, best_score, total_games in rows
+        }
+        order = sorted(self._key(user_id, entry[0]) for user_id, entry in stats.items())
+        with self._lock:
+            self._stats = stats
+            self._order = order
+            self._loaded_at = time.monotonic()
+            self._loaded = True
+
+    def _ensure_fresh(self) -> None:
+        if time.monotonic() - self._loaded_at < self.refresh_seconds and self._loaded:
+            return
+        try:
+            self.rebuild()
+        except Exception as e:
+            if not self._loaded:
+                raise
+            print(f"Error rebuilding leaderboard: {str(e)}")
+            self._loaded_at = time.monotonic()
+
+    def record(self, results) -> None:
+        """Apply committed game results to the in-memory ranking."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for result in results:
+                total, best, games = self._stats.get(result.user_id, (0.0, 0.0, 0))
+                if games:
+                    old_key = self._key(result.user_id, total)
+                    del self._order[bisect.bisect_left(self._order, old_key)]
+                else:
+                    best = result.total_score
+                total += result.total_score
+                self._stats[result.user_id] = (
+                    total,
+                    max(best, result.total_score),
+                    games + 1,
+                )
+                bisect.insort(self._order, self._key(result.user_id, total))
+
+    def _entry(self, rank: int, user_id: int) -> dict:
+        total, best, games = self._stats[user_id]
+        return {
+            "rank": rank,
+            "user_id": user_id,
+            "total_score": total,
+            "best_score": best,
+            "total_games": games,
+        }
+
+    def top(self, k: int) -> list[dict]:
+        self._ensure_fresh()
+        with self._lock:
+            return [
+                self._entry(rank, user_id)
+                for rank, (_, user_id) in enumerate(self._order[:k], start=1)
+            ]
+
+    def rank(self, user_id: int) -> dict | None:
+        self._ensure_fresh()
+        with self._lock:
+            entry = self._stats.get(user_id)
+            if entry is None:
+                return None
+            index = bisect.bisect_left(self._order, self._key(user_id, entry[0]))
+            return {**self._entry(index + 1, user_id), "total_users": len(self._order)}
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,60 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hackathon.game_results_export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream team19.game_results to a file or stdout as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='fmt',
+            choices=EXPORT_FORMATS,
+            default='ndjson',
+            help='Output format (default: ndjson)',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Output path, or - for stdout (default: -)',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip the output while streaming',
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['fmt']
+        output = options['output']
+        gzip = options['gzip']
+
+        started = time.monotonic()
+        written = 0
+
+        if output == '-':
+            out = sys.stdout.buffer
+        else:
+            try:
+                out = open(output, 'wb')
+            except OSError as exc:
+                raise CommandError(f'Cannot open output file: {output}') from exc
+
+        try:
+            for chunk in iter_export(fmt, gzip=gzip):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+            else:
+                out.flush()
+
+        if output != '-':
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'Bytes written: {written} in {elapsed:.1f}s')
+            self.stdout.write(self.style.SUCCESS('Export completed.'))
@@ -0,0 +1,250 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hackathon.game_results import GAME_RESULTS_INDEXES, SUMMARY_TABLES_DDL, india_now
+
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE team19.game_results (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        user_id BIGINT NOT NULL,
+        total_score DOUBLE NOT NULL,
+        total_time_spent INT NOT NULL,
+        tasks_completed INT NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (id, created_at)
+    )
+    PARTITION BY RANGE COLUMNS (created_at) ({partitions})
+"""
+
+# Partitioning needs created_at in every unique key, so the primary key of an
+# existing table is widened before it is partitioned.
+CONVERT_TABLE_SQL = """
+    ALTER TABLE team19.game_results
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at),
+    PARTITION BY RANGE COLUMNS (created_at) ({partitions})
+"""
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f'p{month:%Y%m}'
+
+
+def _partition_sql(month: date) -> str:
+    upper = _add_months(month, 1)
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{upper:%Y-%m-%d}')"
+
+
+def _partitions_sql(months: list[date]) -> str:
+    parts = [_partition_sql(month) for month in months]
+    parts.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    return ', '.join(parts)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or maintain team19.game_results: monthly range partitions on created_at, '
+        'the indexes the read paths need and the summary tables written with each result'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--create',
+            action='store_true',
+            help='Create the table partitioned if it does not exist',
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Partition an existing unpartitioned table (rewrites the table)',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Keep partitions ready this many months past the current one (default: 3)',
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            help='Drop partitions holding only rows older than this many months',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the statements without running them',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        months_ahead = options['months_ahead']
+        retain_months = options['retain_months']
+
+        if months_ahead < 0:
+            raise CommandError('--months-ahead must not be negative')
+        if retain_months is not None and retain_months < 1:
+            raise CommandError('--retain-months must be at least 1')
+
+        current = india_now().date().replace(day=1)
+        wanted = [_add_months(current, n) for n in range(months_ahead + 1)]
+
+        with connections['student'].cursor() as cursor:
+            self.cursor = cursor
+            exists = self._table_exists()
+            partitions = self._partitions() if exists else {}
+
+            if not exists:
+                if not options['create']:
+                    raise CommandError('team19.game_results does not exist; pass --create')
+                self._run(CREATE_TABLE_SQL.format(partitions=_partitions_sql(wanted)))
+                partitions = {_partition_name(m): _add_months(m, 1) for m in wanted}
+            elif not partitions:
+                if not options['convert']:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            'team19.game_results is not partitioned; pass --convert to partition it'
+                        )
+                    )
+                else:
+                    first = self._oldest_month() or current
+                    months = [
+                        _add_months(first, n)
+                        for n in range(self._months_between(first, wanted[-1]) + 1)
+                    ]
+                    self._run(CONVERT_TABLE_SQL.format(partitions=_partitions_sql(months)))
+                    partitions = {_partition_name(m): _add_months(m, 1) for m in months}
+
+            if partitions:
+                self._roll_forward(partitions, wanted)
+                if retain_months is not None:
+                    self._drop_old(partitions, _add_months(current, -retain_months))
+
+            self._ensure_indexes()
+            self._ensure_summary_tables()
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('Dry-run enabled: no DB changes.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Schema up to date.'))
+
+    def _run(self, sql: str) -> None:
+        self.stdout.write(' '.join(sql.split()))
+        if not self.dry_run:
+            self.cursor.execute(sql)
+
+    def _table_exists(self) -> bool:
+        self.cursor.execute(
+            """
+            SELECT COUNT(*)
+            FROM information_schema.tables
+            WHERE table_schema = 'team19' AND table_name = 'game_results'
+            """
+        )
+        return self.cursor.fetchone()[0] > 0
+
+    def _partitions(self) -> dict[str, date | None]:
+        """Map partition name to its exclusive upper bound (None for MAXVALUE)."""
+        self.cursor.execute(
+            """
+            SELECT partition_name, partition_description
+            FROM information_schema.partitions
+            WHERE table_schema = 'team19' AND table_name = 'game_results'
+              AND partition_name IS NOT NULL
+            """
+        )
+        partitions = {}
+        for name, description in self.cursor.fetchall():
+            bound = (description or '').strip("'")
+            partitions[name] = None if bound == 'MAXVALUE' else date.fromisoformat(bound[:10])
+        return partitions
+
+    def _oldest_month(self) -> date | None:
+        self.cursor.execute('SELECT MIN(created_at) FROM team19.game_results')
+        oldest = self.cursor.fetchone()[0]
+        return oldest.date().replace(day=1) if oldest else None
+
+    @staticmethod
+    def _months_between(first: date, last: date) -> int:
+        return (last.year - first.year) * 12 + last.month - first.month
+
+    def _roll_forward(self, partitions: dict[str, date | None], wanted: list[date]) -> None:
+        missing = [m for m in wanted if _partition_name(m) not in partitions]
+        if not missing:
+            return
+        if 'pmax' not in partitions:
+            raise CommandError('team19.game_results has no pmax partition to split')
+
+        parts = ', '.join(_partition_sql(m) for m in missing)
+        self._run(
+            'ALTER TABLE team19.game_results REORGANIZE PARTITION pmax INTO '
+            f'({parts}, PARTITION pmax VALUES LESS THAN (MAXVALUE))'
+        )
+        for month in missing:
+            partitions[_partition_name(month)] = _add_months(month, 1)
+
+    def _drop_old(self, partitions: dict[str, date | None], cutoff: date) -> None:
+        old = sorted(
+            name for name, upper in partitions.items() if upper is not None and upper <= cutoff
+        )
+        if not old:
+            return
+        self._run(f'ALTER TABLE team19.game_results DROP PARTITION {", ".join(old)}')
+        for name in old:
+            partitions.pop(name)
+
+    def _ensure_indexes(self) -> None:
+        self.cursor.execute(
+            """
+            SELECT DISTINCT index_name
+            FROM information_schema.statistics
+            WHERE table_schema = 'team19' AND table_name = 'game_results'
+            """
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+
+        for name, columns in GAME_RESULTS_INDEXES.items():
+            if name in existing:
+                self.stdout.write(f'Index {name} already exists')
+                continue
+            self._run(f'CREATE INDEX {name} ON team19.game_results {columns}')
+
+    def _ensure_summary_tables(self) -> None:
+        self.cursor.execute(
+            """
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'team19'
+            """
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+
+        for name, ddl in SUMMARY_TABLES_DDL.items():
+            if name in existing:
+                self.stdout.write(f'Table {name} already exists')
+                continue
+            self._run(ddl)
+
+        # Tables created before claim ids were introduced lack the column.
+        if 'game_result_keys' in existing:
+            self.cursor.execute(
+                """
+                SELECT COUNT(*)
+                FROM information_schema.columns
+                WHERE table_schema = 'team19' AND table_name = 'game_result_keys'
+                  AND column_name = 'claim_id'
+                """
+            )
+            if not self.cursor.fetchone()[0]:
+                self._run(
+                    "ALTER TABLE team19.game_result_keys "
+                    "ADD COLUMN claim_id CHAR(32) NOT NULL DEFAULT '' AFTER idempotency_key"
+                )
@@ -1,8 +1,13 @@
 import csv
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils import timezone
 
 from hackathon.auth import PBKDF2_ITERATIONS, hash_password
 from hackathon.models import AppUser, AppUserMember
@@ -22,6 +27,37 @@ def _format_password(team_no: int) -> str:
     return f'Team@{team_no:03d}'
 
 
+@dataclass
+class TeamPlan:
+    team_no: int
+    user: AppUser | None
+    update_user: bool
+    existing_members: dict[str, AppUserMember]
+    create_members: list[dict] = field(default_factory=list)
+    update_members: list[tuple[AppUserMember, dict]] = field(default_factory=list)
+    delete_member_ids: list[int] = field(default_factory=list)
+
+    @property
+    def needs_password(self) -> bool:
+        return self.user is None or self.update_user
+
+    def describe(self) -> str:
+        if self.user is None:
+            action = 'create team'
+        elif self.update_user:
+            action = 'update team'
+        else:
+            action = 'keep team'
+        return (
+            f'Team {self.team_no}: {action}; members +{len(self.create_members)} '
+            f'~{len(self.update_members)} -{len(self.delete_member_ids)}'
+        )
+
+
+def _hash_team_password(team_no: int) -> tuple[str, str, int]:
+    return hash_password(_format_password(team_no), iterations=PBKDF2_ITERATIONS)
+
+
 def _normalize_phone(raw: str) -> str:
     phone = re.sub(r'\D+', '', (raw or '').strip())
     if not phone:
@@ -49,11 +85,25 @@ class Command(BaseCommand):
             action='store_true',
             help='Only create new teams/members found in CSV; do not update passwords or delete existing members',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes used to hash team passwords (default: CPU count)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Teams written per transaction (default: 100)',
+        )
 
     def handle(self, *args, **options):
         csv_path = options['csv_path']
         dry_run = options['dry_run']
         append_only = options['append_only']
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
 
         try:
             with open(csv_path, newline='', encoding='utf-8') as f:
@@ -105,74 +155,138 @@ class Command(BaseCommand):
             if len(members) > 5:
                 raise CommandError(f'Team {team_no} has {len(members)} members (> 5).')
 
+        for team_no, members in teams.items():
+            unique_by_phone: dict[str, dict] = {}
+            for m in members:
+                unique_by_phone[m['phone']] = m
+            teams[team_no] = list(unique_by_phone.values())
+
+        plans = self._build_plan(teams, append_only)
+
         if append_only:
-            for team_no, members in teams.items():
-                existing_user = AppUser.objects.filter(team_no=team_no).first()
-                if existing_user is None:
-                    continue
-
-                existing_phones = set(
-                    AppUserMember.objects.filter(user=existing_user).values_list('phone', flat=True)
-                )
-                incoming_phones = {m['phone'] for m in members}
-                new_phones = incoming_phones - existing_phones
-                total_after = len(existing_phones) + len(new_phones)
+            for plan in plans:
+                total_after = len(plan.existing_members) + len(plan.create_members)
                 if total_after > 5:
                     raise CommandError(
-                        f'Team {team_no} would have {total_after} members (> 5) after append-only import.'
+                        f'Team {plan.team_no} would have {total_after} members (> 5) after append-only import.'
                     )
 
         if dry_run:
+            for plan in plans:
+                self.stdout.write(plan.describe())
             self.stdout.write(self.style.WARNING('Dry-run enabled: no DB changes.'))
             return
 
-        with transaction.atomic():
-            for team_no, members in teams.items():
-                unique_by_phone: dict[str, dict] = {}
-                for m in members:
-                    unique_by_phone[m['phone']] = m
-                members = list(unique_by_phone.values())
-
-                password = _format_password(team_no)
-                salt_b64, password_hash_b64, iterations = hash_password(password, iterations=PBKDF2_ITERATIONS)
-
-                user, created = AppUser.objects.get_or_create(
-                    team_no=team_no,
-                    defaults={
-                        'username': f'Team {team_no}',
-                        'email': None,
-                        'phone': None,
-                        'password_salt_b64': salt_b64,
-                        'password_hash_b64': password_hash_b64,
-                        'password_iterations': iterations,
-                        'is_active': True,
-                    },
-                )
-
-                if not append_only and not created:
-                    AppUser.objects.filter(id=user.id).update(
-                        username=f'Team {team_no}',
-                        password_salt_b64=salt_b64,
-                        password_hash_b64=password_hash_b64,
-                        password_iterations=iterations,
-                        is_active=True,
-                    )
-
-                if not append_only:
-                    AppUserMember.objects.filter(user=user).exclude(phone__in=[m['phone'] for m in members]).delete()
-
-                for m in members:
-                    if append_only:
-                        AppUserMember.objects.get_or_create(
-                            user=user,
-                            phone=m['phone'],
-                            defaults={'name': m['name'], 'email': m['email']},
-                        )
-                    else:
-                        AppUserMember.objects.update_or_create(
-                            user=user,
-                            phone=m['phone'],
-                            defaults={'name': m['name'], 'email': m['email']},
-                        )
+        to_hash = [plan.team_no for plan in plans if plan.needs_password]
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(to_hash) // (workers * 4))
+            passwords = dict(zip(to_hash, pool.map(_hash_team_password, to_hash, chunksize=chunksize)))
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Hashed {len(passwords)} passwords in {elapsed:.1f}s using {workers} workers')
+
+        started = time.monotonic()
+        for start in range(0, len(plans), batch_size):
+            batch = plans[start:start + batch_size]
+            with transaction.atomic():
+                self._write_batch(batch, passwords)
+
+            done = start + len(batch)
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed > 0 else 0
+            self.stdout.write(f'  {done}/{len(plans)} teams written ({rate:.1f} teams/sec)')
 
         self.stdout.write(self.style.SUCCESS('Import completed.'))
+
+    def _build_plan(self, teams: dict[int, list[dict]], append_only: bool) -> list[TeamPlan]:
+        """Diff the CSV roster against the DB using two queries in total."""
+        team_nos = sorted(teams)
+        users_by_team = {u.team_no: u for u in AppUser.objects.filter(team_no__in=team_nos)}
+
+        members_by_user: dict[int, dict[str, AppUserMember]] = {}
+        for member in AppUserMember.objects.filter(user__in=list(users_by_team.values())):
+            members_by_user.setdefault(member.user_id, {})[member.phone] = member
+
+        plans = []
+        for team_no in team_nos:
+            user = users_by_team.get(team_no)
+            existing = members_by_user.get(user.id, {}) if user is not None else {}
+            plan = TeamPlan(
+                team_no=team_no,
+                user=user,
+                update_user=user is not None and not append_only,
+                existing_members=existing,
+            )
+            incoming_phones = set()
+            for m in teams[team_no]:
+                incoming_phones.add(m['phone'])
+                member = existing.get(m['phone'])
+                if member is None:
+                    plan.create_members.append(m)
+                elif not append_only:
+                    plan.update_members.append((member, m))
+            if not append_only:
+                plan.delete_member_ids = [
+                    member.id for phone, member in existing.items() if phone not in incoming_phones
+                ]
+            plans.append(plan)
+        return plans
+
+    def _write_batch(self, batch: list[TeamPlan], passwords: dict[int, tuple[str, str, int]]) -> None:
+        new_users = [
+            AppUser(
+                team_no=plan.team_no,
+                username=f'Team {plan.team_no}',
+                email=None,
+                phone=None,
+                password_salt_b64=passwords[plan.team_no][0],
+                password_hash_b64=passwords[plan.team_no][1],
+                password_iterations=passwords[plan.team_no][2],
+                is_active=True,
+            )
+            for plan in batch
+            if plan.user is None
+        ]
+        if new_users:
+            AppUser.objects.bulk_create(new_users)
+            # MySQL does not return ids from bulk_create, so re-read them.
+            created = {u.team_no: u for u in AppUser.objects.filter(team_no__in=[u.team_no for u in new_users])}
+            for plan in batch:
+                if plan.user is None:
+                    plan.user = created[plan.team_no]
+
+        updated_users = []
+        for plan in batch:
+            if plan.update_user:
+                user = plan.user
+                user.username = f'Team {plan.team_no}'
+                user.password_salt_b64, user.password_hash_b64, user.password_iterations = passwords[plan.team_no]
+                user.is_active = True
+                updated_users.append(user)
+        if updated_users:
+            AppUser.objects.bulk_update(
+                updated_users,
+                ['username', 'password_salt_b64', 'password_hash_b64', 'password_iterations', 'is_active'],
+            )
+
+        to_delete = [member_id for plan in batch for member_id in plan.delete_member_ids]
+        to_create = [
+            AppUserMember(user=plan.user, phone=m['phone'], name=m['name'], email=m['email'])
+            for plan in batch
+            for m in plan.create_members
+        ]
+        to_update = []
+        now = timezone.now()
+        for plan in batch:
+            for member, m in plan.update_members:
+                member.name = m['name']
+                member.email = m['email']
+                member.updated_at = now
+                to_update.append(member)
+
+        if to_delete:
+            AppUserMember.objects.filter(id__in=to_delete).delete()
+        if to_create:
+            AppUserMember.objects.bulk_create(to_create)
+        if to_update:
+            AppUserMember.objects.bulk_update(to_update, ['name', 'email', 'updated_at'])
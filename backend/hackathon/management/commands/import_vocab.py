@@ -0,0 +1,191 @@
+import csv
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+
+
+_WORD_RE = re.compile(r'^[A-Za-z]+$')
+
+# Optional CSV columns copied through to vocab_words when present.
+_OPTIONAL_COLUMNS = ('word_id', 'audio_file_url')
+
+# The upsert only updates existing words through this key; without it re-runs
+# and --start-row resumes insert every word again.
+UNIQUE_KEY_NAME = 'uniq_vocab_words_anchor_word'
+
+
+def _validate_word(raw: str) -> str:
+    word = (raw or '').strip()
+    if not word:
+        raise ValueError('missing anchor_word')
+    if not _WORD_RE.match(word):
+        raise ValueError(f'anchor_word must contain letters only: {word!r}')
+    if len(word) > 128:
+        raise ValueError(f'anchor_word longer than 128 characters: {word!r}')
+    return word
+
+
+def _upsert_sql(columns: list[str], row_count: int) -> str:
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    updates = ', '.join(f'{col} = VALUES({col})' for col in columns if col != 'word_id')
+    return (
+        f'INSERT INTO vocab_words ({", ".join(columns)}) '
+        f'VALUES {", ".join([placeholders] * row_count)} '
+        f'ON DUPLICATE KEY UPDATE {updates}'
+    )
+
+
+class Command(BaseCommand):
+    help = 'Stream anchor_words.csv / anchor_word_asc.csv into the vocab_words table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv',
+            dest='csv_path',
+            default='../anchor_words.csv',
+            help='Path to CSV with an anchor_word column (default: ../anchor_words.csv)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per multi-row INSERT and transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--start-row',
+            type=int,
+            default=1,
+            help='First data row to load (1-based); use the last reported row + 1 to resume',
+        )
+        parser.add_argument(
+            '--create-unique-key',
+            action='store_true',
+            help=f'Add the {UNIQUE_KEY_NAME} unique key on anchor_word if it is missing',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and show counts without writing to DB',
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['csv_path']
+        batch_size = options['batch_size']
+        start_row = options['start_row']
+        dry_run = options['dry_run']
+
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if start_row < 1:
+            raise CommandError('--start-row must be at least 1')
+
+        self._ensure_unique_key(options['create_unique_key'], dry_run)
+
+        try:
+            f = open(csv_path, newline='', encoding='utf-8')
+        except FileNotFoundError as exc:
+            raise CommandError(f'CSV file not found: {csv_path}') from exc
+
+        loaded = 0
+        skipped = 0
+        last_row = start_row - 1
+        started = time.monotonic()
+
+        with f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            if 'anchor_word' not in fieldnames:
+                raise CommandError(f'CSV header must include anchor_word. Got: {fieldnames}')
+
+            columns = [col for col in _OPTIONAL_COLUMNS if col in fieldnames]
+            columns += ['anchor_word', 'word_length']
+
+            batch: list[list] = []
+            for row_no, row in enumerate(reader, start=1):
+                if row_no < start_row:
+                    continue
+
+                try:
+                    word = _validate_word(row.get('anchor_word'))
+                except ValueError as exc:
+                    skipped += 1
+                    self.stderr.write(f'Row {row_no}: {exc}')
+                    continue
+
+                values = [(row.get(col) or '').strip() or None for col in columns[:-2]]
+                # word_length in the source files is not reliable, so it is
+                # always recomputed from the word.
+                batch.append(values + [word, len(word)])
+
+                if len(batch) >= batch_size:
+                    loaded += self._flush(columns, batch, dry_run)
+                    last_row = row_no
+                    self._report(loaded, last_row, started)
+                    batch = []
+
+            if batch:
+                loaded += self._flush(columns, batch, dry_run)
+                last_row = row_no
+                self._report(loaded, last_row, started)
+
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'Rows loaded: {loaded}')
+        self.stdout.write(f'Rows skipped: {skipped}')
+        self.stdout.write(f'Throughput: {rate:.0f} rows/sec')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('Dry-run enabled: no DB changes.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Import completed.'))
+
+    def _ensure_unique_key(self, create: bool, dry_run: bool) -> None:
+        with connections['student'].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT index_name
+                FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'vocab_words'
+                  AND non_unique = 0
+                GROUP BY index_name
+                HAVING COUNT(*) = 1 AND MAX(column_name) = 'anchor_word'
+                """
+            )
+            if cursor.fetchone() is not None:
+                return
+
+            sql = f'ALTER TABLE vocab_words ADD UNIQUE KEY {UNIQUE_KEY_NAME} (anchor_word)'
+            if not create:
+                raise CommandError(
+                    'vocab_words has no unique key on anchor_word, so the import would '
+                    'insert duplicate words instead of updating them. Remove duplicate '
+                    f'words, then pass --create-unique-key or run: {sql}'
+                )
+            if dry_run:
+                self.stdout.write(f'Would run: {sql}')
+                return
+            try:
+                cursor.execute(sql)
+            except DatabaseError as exc:
+                raise CommandError(
+                    f'Could not add {UNIQUE_KEY_NAME}; remove duplicate words first: {exc}'
+                ) from exc
+            self.stdout.write(f'Added unique key {UNIQUE_KEY_NAME} on vocab_words.anchor_word')
+
+    def _flush(self, columns: list[str], batch: list[list], dry_run: bool) -> int:
+        if dry_run:
+            return len(batch)
+
+        params = [value for values in batch for value in values]
+        with transaction.atomic(using='student'):
+            with connections['student'].cursor() as cursor:
+                cursor.execute(_upsert_sql(columns, len(batch)), params)
+        return len(batch)
+
+    def _report(self, loaded: int, last_row: int, started: float) -> None:
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'  {loaded} rows through row {last_row} ({rate:.0f} rows/sec)')
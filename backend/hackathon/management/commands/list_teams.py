@@ -1,7 +1,23 @@
+import csv
+import json
+
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Prefetch, Q
 from hackathon.models import AppUser, AppUserMember
 
 
+CSV_COLUMNS = [
+    "team_no",
+    "username",
+    "email",
+    "phone",
+    "is_active",
+    "member_name",
+    "member_email",
+    "member_phone",
+]
+
+
 class Command(BaseCommand):
     help = "List all teams and their members"
 
@@ -16,36 +32,55 @@ class Command(BaseCommand):
             action="store_true",
             help="Show all teams (default shows only Team 19 if it exists)",
         )
+        parser.add_argument(
+            "--format",
+            dest="output_format",
+            choices=["text", "json", "csv"],
+            default="text",
+            help="Output format; json and csv stream rows without banners or summary",
+        )
 
     def handle(self, *args, **options):
         specific_team = options.get("team")
         show_all = options.get("show_all")
+        output_format = options.get("output_format") or "text"
+        text = output_format == "text"
 
         # Build query
         users_query = AppUser.objects.all()
-
         if specific_team:
             users_query = users_query.filter(team_no=specific_team)
-            users = users_query.order_by("team_no")
-        elif not show_all:
+        counts = users_query.aggregate(
+            total=Count("id"),
+            with_no=Count("team_no"),
+            team19=Count("id", filter=Q(team_no=19)),
+        )
+        members = Prefetch("members", queryset=AppUserMember.objects.order_by("id"))
+
+        if not specific_team and not show_all:
             # Default: show only Team 19 if it exists, otherwise show all
-            team19 = users_query.filter(team_no=19).first()
-            if team19:
-                users = [team19]
-                self.stdout.write(self.style.SUCCESS("=== YOUR TEAM (Team 19) ===\n"))
-            else:
-                users = users_query.order_by("team_no")
+            if counts["team19"]:
+                users_query = users_query.filter(team_no=19)
+                if text:
+                    self.stdout.write(self.style.SUCCESS("=== YOUR TEAM (Team 19) ===\n"))
+            elif text:
                 self.stdout.write(
                     self.style.WARNING("Team 19 not found. Showing all teams.\n")
                 )
-        else:
-            users = users_query.order_by("team_no")
+        users = list(users_query.order_by("team_no").prefetch_related(members))
+
+        if output_format == "json":
+            self._write_json(users)
+            return
+        if output_format == "csv":
+            self._write_csv(users)
+            return
 
         if not users:
             self.stdout.write(self.style.WARNING("No teams found in database."))
             return
 
-        total_count = users_query.count()
+        total_count = counts["total"]
         self.stdout.write(
             self.style.SUCCESS(f"Total teams in database: {total_count}\n")
         )
@@ -69,8 +104,8 @@ class Command(BaseCommand):
             self.stdout.write(f'  Phone: {user.phone or "N/A"}')
             self.stdout.write(f"  Active: {user.is_active}")
 
-            members = AppUserMember.objects.filter(user=user)
-            self.stdout.write(f"  Members ({members.count()}):")
+            members = user.members.all()
+            self.stdout.write(f"  Members ({len(members)}):")
             for member in members:
                 self.stdout.write(
                     f'    - {member.name} | {member.email or "N/A"} | {member.phone}'
@@ -92,9 +127,9 @@ class Command(BaseCommand):
             self.stdout.write("")
 
         # Summary
-        teams_with_no = users_query.filter(team_no__isnull=False).count()
-        teams_without_no = users_query.filter(team_no__isnull=True).count()
-        team19_exists = users_query.filter(team_no=19).exists()
+        teams_with_no = counts["with_no"]
+        teams_without_no = counts["total"] - counts["with_no"]
+        team19_exists = bool(counts["team19"])
 
         self.stdout.write(self.style.SUCCESS(f"Summary:"))
         self.stdout.write(f"  Total teams: {total_count}")
@@ -114,3 +149,33 @@ class Command(BaseCommand):
             self.stdout.write(
                 "  python manage.py import_teams --csv team19_only.csv --append-only"
             )
+
+    def _write_json(self, users):
+        # Written one team per line so output starts before the list ends.
+        self.stdout.write("[", ending="")
+        for index, user in enumerate(users):
+            team = {
+                "team_no": user.team_no,
+                "username": user.username,
+                "email": user.email,
+                "phone": user.phone,
+                "is_active": user.is_active,
+                "members": [
+                    {"name": m.name, "email": m.email, "phone": m.phone}
+                    for m in user.members.all()
+                ],
+            }
+            separator = "," if index else ""
+            self.stdout.write(f"{separator}\n{json.dumps(team)}", ending="")
+        self.stdout.write("\n]")
+
+    def _write_csv(self, users):
+        writer = csv.writer(self.stdout, lineterminator="\n")
+        writer.writerow(CSV_COLUMNS)
+        for user in users:
+            team = [user.team_no, user.username, user.email, user.phone, user.is_active]
+            members = user.members.all()
+            if not members:
+                writer.writerow(team + ["", "", ""])
+            for m in members:
+                writer.writerow(team + [m.name, m.email, m.phone])
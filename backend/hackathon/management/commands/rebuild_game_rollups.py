@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+
+# SQL truncating created_at to the start of its bucket.
+_BUCKET_SQL = {
+    'hour': "DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:00:00')",
+    'day': 'DATE(created_at)',
+}
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly/daily activity rollups from team19.game_results'
+
+    def handle(self, *args, **options):
+        with transaction.atomic(using='student'):
+            with connections['student'].cursor() as cursor:
+                cursor.execute('DELETE FROM team19.game_activity_users')
+                cursor.execute('DELETE FROM team19.game_activity_rollups')
+
+                for granularity, bucket in _BUCKET_SQL.items():
+                    cursor.execute(
+                        f"""
+                        INSERT INTO team19.game_activity_users
+                        (granularity, bucket_start, user_id)
+                        SELECT DISTINCT %s, {bucket}, user_id
+                        FROM team19.game_results
+                        """,
+                        [granularity],
+                    )
+                    cursor.execute(
+                        f"""
+                        INSERT INTO team19.game_activity_rollups
+                        (granularity, bucket_start, games, total_score, total_time,
+                         total_tasks, distinct_users)
+                        SELECT
+                            %s,
+                            {bucket} AS bucket,
+                            COUNT(*),
+                            COALESCE(SUM(total_score), 0),
+                            COALESCE(SUM(total_time_spent), 0),
+                            COALESCE(SUM(tasks_completed), 0),
+                            COUNT(DISTINCT user_id)
+                        FROM team19.game_results
+                        GROUP BY bucket
+                        """,
+                        [granularity],
+                    )
+                    self.stdout.write(f'{granularity} buckets rebuilt: {cursor.rowcount}')
+
+        self.stdout.write(self.style.SUCCESS('Rebuild completed.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuild team19.game_user_stats from team19.game_results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            dest='user_id',
+            help='Rebuild only this user id',
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get('user_id')
+
+        where = ''
+        params = []
+        if user_id is not None:
+            where = 'WHERE user_id = %s'
+            params = [user_id]
+
+        with transaction.atomic(using='student'):
+            with connections['student'].cursor() as cursor:
+                cursor.execute(f'DELETE FROM team19.game_user_stats {where}', params)
+                cursor.execute(
+                    f"""
+                    INSERT INTO team19.game_user_stats
+                    (user_id, total_games, total_score, best_score, total_time, total_tasks, updated_at)
+                    SELECT
+                        user_id,
+                        COUNT(*),
+                        COALESCE(SUM(total_score), 0),
+                        COALESCE(MAX(total_score), 0),
+                        COALESCE(SUM(total_time_spent), 0),
+                        COALESCE(SUM(tasks_completed), 0),
+                        NOW()
+                    FROM team19.game_results
+                    {where}
+                    GROUP BY user_id
+                    """,
+                    params,
+                )
+                rebuilt = cursor.rowcount
+
+        self.stdout.write(f'Users rebuilt: {rebuilt}')
+        self.stdout.write(self.style.SUCCESS('Rebuild completed.'))
@@ -1,24 +1,47 @@
 from __future__ import annotations
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpRequest, HttpResponse
 
 
 class CorsMiddleware:
+    # Supports both stacks so async views are not forced onto a thread.
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
-    def __call__(self, request: HttpRequest) -> HttpResponse:
+    def __call__(self, request: HttpRequest):
+        if self.is_async:
+            return self.__acall__(request)
         if request.method == 'OPTIONS':
             response = HttpResponse(status=204)
         else:
             response = self.get_response(request)
+        return self._add_headers(request, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if request.method == 'OPTIONS':
+            response = HttpResponse(status=204)
+        else:
+            response = await self.get_response(request)
+        return self._add_headers(request, response)
 
+    @staticmethod
+    def _add_headers(request: HttpRequest, response: HttpResponse) -> HttpResponse:
         origin = request.headers.get('Origin')
         if origin:
             response['Access-Control-Allow-Origin'] = origin
             response['Vary'] = 'Origin'
             response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Authorization, Content-Type'
+            response['Access-Control-Allow-Headers'] = (
+                'Authorization, Content-Type, Idempotency-Key, X-Read-Your-Writes'
+            )
+            response['Access-Control-Expose-Headers'] = 'X-Read-Your-Writes'
             response['Access-Control-Max-Age'] = '86400'
 
         return response
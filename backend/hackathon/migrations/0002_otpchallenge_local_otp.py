@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otpchallenge',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='otpchallenge',
+            name='otp_hash_b64',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.AddField(
+            model_name='otpchallenge',
+            name='otp_iterations',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='otpchallenge',
+            name='otp_salt_b64',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
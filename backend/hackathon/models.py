@@ -69,6 +69,13 @@ class OtpChallenge(models.Model):
     expires_at = models.DateTimeField()
     consumed_at = models.DateTimeField(null=True, blank=True)
 
+    # Set when the code was generated here (OTP_MODE=local) and is checked
+    # locally instead of by the gateway.
+    otp_salt_b64 = models.CharField(max_length=64, blank=True, default='')
+    otp_hash_b64 = models.CharField(max_length=128, blank=True, default='')
+    otp_iterations = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=['identifier', 'expires_at']),
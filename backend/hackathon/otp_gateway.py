@@ -0,0 +1,324 @@
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import httpx
+import urllib3
+
+
+OTP_GATEWAY_TIMEOUT_SECONDS = float(os.getenv("OTP_GATEWAY_TIMEOUT_SECONDS") or 5)
+OTP_GATEWAY_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("OTP_GATEWAY_CONNECT_TIMEOUT_SECONDS") or 2
+)
+OTP_GATEWAY_RETRIES = int(os.getenv("OTP_GATEWAY_RETRIES") or 2)
+OTP_GATEWAY_POOL_SIZE = int(os.getenv("OTP_GATEWAY_POOL_SIZE") or 10)
+OTP_GATEWAY_ASYNC_CONNECTIONS = int(os.getenv("OTP_GATEWAY_ASYNC_CONNECTIONS") or 200)
+OTP_GATEWAY_BREAKER_FAILURES = int(os.getenv("OTP_GATEWAY_BREAKER_FAILURES") or 5)
+OTP_GATEWAY_BREAKER_RESET_SECONDS = float(
+    os.getenv("OTP_GATEWAY_BREAKER_RESET_SECONDS") or 30
+)
+
+_RETRY_BACKOFF_SECONDS = 0.1
+_RETRYABLE_STATUSES = {502, 503, 504}
+
+
+class OtpGatewayError(RuntimeError):
+    pass
+
+
+class OtpGatewayUnavailable(OtpGatewayError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail immediately. After ``reset_seconds`` one trial
+    call is let through (half-open); its outcome closes or re-opens it. A
+    trial that ends without an outcome (e.g. a cancelled async call) must be
+    handed back with ``release_trial`` so another one can be made.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = OTP_GATEWAY_BREAKER_FAILURES,
+        reset_seconds: float = OTP_GATEWAY_BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def acquire(self) -> tuple[bool, bool]:
+        """Return ``(allowed, is_trial)`` for a new call."""
+        with self._lock:
+            if self._opened_at is None:
+                return True, False
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False, False
+            if self._trial_in_flight:
+                return False, False
+            self._trial_in_flight = True
+            return True, True
+
+    def release_trial(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class OtpGatewayClient:
+    """Shared HTTP client for the OTP gateway.
+
+    Connections are pooled and kept alive across calls, with ``post_form``
+    for sync callers and ``apost_form`` for async views. Each call has an
+    overall deadline covering retries; retries use jittered exponential
+    backoff and only happen when repeating the request is safe. Repeated
+    failures open a circuit breaker so callers fail fast while the gateway
+    is unhealthy.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout_seconds: float = OTP_GATEWAY_TIMEOUT_SECONDS,
+        connect_timeout_seconds: float = OTP_GATEWAY_CONNECT_TIMEOUT_SECONDS,
+        retries: int = OTP_GATEWAY_RETRIES,
+        pool_size: int = OTP_GATEWAY_POOL_SIZE,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self._pool = urllib3.PoolManager(num_pools=4, maxsize=pool_size)
+        self._pool_size = pool_size
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._failures = 0
+        self._retries = 0
+        self._rejected = 0
+        self._latency_ms_total = 0.0
+        self._latency_ms_max = 0.0
+
+    @staticmethod
+    def _config() -> tuple[str, dict]:
+        url = (os.getenv("OTP_GATEWAY_URL") or "").strip()
+        auth_header = (os.getenv("OTP_GATEWAY_AUTH_HEADER") or "").strip()
+        if not url:
+            raise OtpGatewayError("Missing OTP_GATEWAY_URL environment variable")
+
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Accept": "application/json",
+        }
+        if auth_header:
+            headers["Authorization"] = auth_header
+        return url, headers
+
+    def _send(self, url: str, headers: dict, body: str, remaining: float):
+        return self._pool.request(
+            "POST",
+            url,
+            body=body,
+            headers=headers,
+            timeout=urllib3.Timeout(
+                connect=min(self.connect_timeout_seconds, remaining), read=remaining
+            ),
+            retries=False,
+        )
+
+    async def _asend(self, url: str, headers: dict, body: str, remaining: float):
+        # An httpx client is bound to the event loop it was first used on.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OTP_GATEWAY_ASYNC_CONNECTIONS,
+                    max_keepalive_connections=self._pool_size,
+                )
+            )
+            self._async_loop = loop
+        return await self._async_client.post(
+            url,
+            content=body,
+            headers=headers,
+            timeout=httpx.Timeout(
+                remaining, connect=min(self.connect_timeout_seconds, remaining)
+            ),
+        )
+
+    def _start(self) -> tuple[float, bool]:
+        allowed, trial = self.breaker.acquire()
+        if not allowed:
+            with self._lock:
+                self._rejected += 1
+            raise OtpGatewayUnavailable("OTP gateway temporarily unavailable")
+        return time.monotonic(), trial
+
+    def _finish(self, started: float, trial: bool, failed: bool) -> None:
+        if trial:
+            # Normally already cleared by record_success/record_failure; this
+            # covers calls cancelled or interrupted before an outcome.
+            self.breaker.release_trial()
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._calls += 1
+            self._failures += int(failed)
+            self._latency_ms_total += elapsed_ms
+            self._latency_ms_max = max(self._latency_ms_max, elapsed_ms)
+
+    def _read_response(
+        self, status: int, data: bytes, idempotent: bool
+    ) -> tuple[dict | None, OtpGatewayError | None, bool]:
+        """Return ``(result, error, retryable)`` for one gateway response."""
+        if 200 <= status < 300:
+            self.breaker.record_success()
+            try:
+                result = json.loads(data.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+                raise OtpGatewayError("OTP gateway returned invalid JSON") from exc
+            return (result if isinstance(result, dict) else {}), None, False
+
+        error = OtpGatewayError(f"OTP gateway returned HTTP {status}")
+        if status < 500:
+            # The gateway answered; the request itself was rejected.
+            self.breaker.record_success()
+            raise error
+        return None, error, idempotent and status in _RETRYABLE_STATUSES
+
+    def _backoff(
+        self, error: OtpGatewayError, retryable: bool, attempt: int, deadline: float
+    ) -> float:
+        """Return how long to wait before retrying, or raise ``error``."""
+        backoff = _RETRY_BACKOFF_SECONDS * (2**attempt) * random.uniform(0.5, 1.5)
+        if (
+            not retryable
+            or attempt >= self.retries
+            or time.monotonic() + backoff >= deadline
+        ):
+            self.breaker.record_failure()
+            raise error
+        with self._lock:
+            self._retries += 1
+        return backoff
+
+    @staticmethod
+    def _transport_error(exc: Exception) -> OtpGatewayError:
+        error = OtpGatewayError("Unable to reach OTP gateway")
+        error.__cause__ = exc
+        return error
+
+    def post_form(self, payload: dict, *, idempotent: bool = False) -> dict:
+        """POST ``payload`` and return the decoded JSON body.
+
+        Requests that may not have reached the gateway (connection failures)
+        are always retried; others only when ``idempotent`` is set.
+        """
+        url, headers = self._config()
+        body = urllib.parse.urlencode(payload)
+        started, trial = self._start()
+        deadline = started + self.timeout_seconds
+        failed = True
+        try:
+            for attempt in itertools.count():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.breaker.record_failure()
+                    raise OtpGatewayError("OTP gateway timed out")
+                try:
+                    resp = self._send(url, headers, body, remaining)
+                except (
+                    urllib3.exceptions.ConnectTimeoutError,
+                    urllib3.exceptions.NewConnectionError,
+                ) as exc:
+                    error, retryable = self._transport_error(exc), True
+                except urllib3.exceptions.HTTPError as exc:
+                    error, retryable = self._transport_error(exc), idempotent
+                else:
+                    result, error, retryable = self._read_response(
+                        resp.status, resp.data, idempotent
+                    )
+                    if error is None:
+                        failed = False
+                        return result
+                time.sleep(self._backoff(error, retryable, attempt, deadline))
+        finally:
+            self._finish(started, trial, failed)
+
+    async def apost_form(self, payload: dict, *, idempotent: bool = False) -> dict:
+        """Async variant of ``post_form``; shares the breaker and metrics."""
+        url, headers = self._config()
+        body = urllib.parse.urlencode(payload)
+        started, trial = self._start()
+        deadline = started + self.timeout_seconds
+        failed = True
+        try:
+            for attempt in itertools.count():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.breaker.record_failure()
+                    raise OtpGatewayError("OTP gateway timed out")
+                try:
+                    resp = await self._asend(url, headers, body, remaining)
+                except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                    error, retryable = self._transport_error(exc), True
+                except httpx.TransportError as exc:
+                    error, retryable = self._transport_error(exc), idempotent
+                else:
+                    result, error, retryable = self._read_response(
+                        resp.status_code, resp.content, idempotent
+                    )
+                    if error is None:
+                        failed = False
+                        return result
+                await asyncio.sleep(self._backoff(error, retryable, attempt, deadline))
+        finally:
+            self._finish(started, trial, failed)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "breaker_state": self.breaker.state,
+                "calls": self._calls,
+                "failures": self._failures,
+                "retries": self._retries,
+                "rejected_by_breaker": self._rejected,
+                "avg_latency_ms": round(self._latency_ms_total / self._calls, 2)
+                if self._calls
+                else 0.0,
+                "max_latency_ms": round(self._latency_ms_max, 2),
+            }
+
+
+otp_gateway = OtpGatewayClient()
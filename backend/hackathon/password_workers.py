@@ -0,0 +1,215 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .auth import verify_password
+
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS") or os.cpu_count() or 1)
+PASSWORD_POOL_QUEUE_LIMIT = int(
+    os.getenv("PASSWORD_POOL_QUEUE_LIMIT") or PASSWORD_POOL_WORKERS * 4
+)
+PASSWORD_POOL_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_POOL_TIMEOUT_SECONDS") or 10)
+VERIFIED_CREDENTIAL_TTL_SECONDS = float(
+    os.getenv("VERIFIED_CREDENTIAL_TTL_SECONDS") or 300
+)
+VERIFIED_CREDENTIAL_CACHE_SIZE = int(os.getenv("VERIFIED_CREDENTIAL_CACHE_SIZE") or 10000)
+
+
+class PasswordPoolSaturated(RuntimeError):
+    pass
+
+
+class PasswordWorkerPool:
+    """Runs PBKDF2 password checks in a bounded pool of worker processes.
+
+    At most ``workers + queue_limit`` checks are admitted at once; beyond
+    that ``verify`` raises PasswordPoolSaturated immediately so the caller
+    can answer 503 instead of tying up a request worker. With ``workers``
+    set to 0 checks run inline in the calling thread, still bounded.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_POOL_WORKERS,
+        queue_limit: int = PASSWORD_POOL_QUEUE_LIMIT,
+        timeout_seconds: float = PASSWORD_POOL_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.capacity = max(workers, 1) + queue_limit
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._latency_ms_total = 0.0
+        self._latency_ms_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def verify(
+        self, password: str, *, salt_b64: str, password_hash_b64: str, iterations: int
+    ) -> bool:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordPoolSaturated("Too many login attempts in progress")
+
+        with self._lock:
+            self._in_flight += 1
+        started = time.monotonic()
+        try:
+            if self.workers <= 0:
+                return verify_password(
+                    password,
+                    salt_b64=salt_b64,
+                    password_hash_b64=password_hash_b64,
+                    iterations=iterations,
+                )
+
+            executor = self._get_executor()
+            try:
+                future = executor.submit(
+                    verify_password,
+                    password,
+                    salt_b64=salt_b64,
+                    password_hash_b64=password_hash_b64,
+                    iterations=iterations,
+                )
+                return future.result(timeout=self.timeout_seconds)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                raise
+            except FutureTimeoutError:
+                future.cancel()
+                with self._lock:
+                    self._timeouts += 1
+                raise PasswordPoolSaturated("Password check timed out")
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._latency_ms_total += elapsed_ms
+                self._latency_ms_max = max(self._latency_ms_max, elapsed_ms)
+            self._slots.release()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_latency_ms": round(self._latency_ms_total / self._completed, 2)
+                if self._completed
+                else 0.0,
+                "max_latency_ms": round(self._latency_ms_max, 2),
+            }
+
+
+class VerifiedCredentialCache:
+    """Short-lived record of (user, password, stored hash) triples that passed.
+
+    Entries are keyed by an HMAC under a per-process random key, so neither
+    passwords nor anything usable offline are kept. The stored salt and hash
+    are part of the key: changing a password makes old entries unreachable.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = VERIFIED_CREDENTIAL_TTL_SECONDS,
+        max_size: int = VERIFIED_CREDENTIAL_CACHE_SIZE,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._key = secrets.token_bytes(32)
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _entry_key(
+        self, user_id: int, password: str, salt_b64: str, password_hash_b64: str, iterations: int
+    ) -> bytes:
+        message = "\0".join(
+            [str(user_id), password, salt_b64, password_hash_b64, str(iterations)]
+        )
+        return hmac.new(self._key, message.encode("utf-8"), hashlib.sha256).digest()
+
+    def contains(self, *args) -> bool:
+        entry_key = self._entry_key(*args)
+        with self._lock:
+            deadline = self._entries.get(entry_key)
+            if deadline is None or time.monotonic() >= deadline:
+                self._entries.pop(entry_key, None)
+                self._misses += 1
+                return False
+            self._hits += 1
+            return True
+
+    def add(self, *args) -> None:
+        entry_key = self._entry_key(*args)
+        with self._lock:
+            self._entries[entry_key] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+password_pool = PasswordWorkerPool()
+verified_credentials = VerifiedCredentialCache()
+
+
+def verify_user_password(user, password: str) -> bool:
+    """Check ``password`` against an AppUser, skipping the KDF on a recent match."""
+    args = (
+        user.id,
+        password,
+        user.password_salt_b64,
+        user.password_hash_b64,
+        user.password_iterations,
+    )
+    if verified_credentials.contains(*args):
+        return True
+
+    ok = password_pool.verify(
+        password,
+        salt_b64=user.password_salt_b64,
+        password_hash_b64=user.password_hash_b64,
+        iterations=user.password_iterations,
+    )
+    if ok:
+        verified_credentials.add(*args)
+    return ok
@@ -0,0 +1,143 @@
+import itertools
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+PRIMARY_ALIAS = "student"
+REPLICA_HEALTH_SECONDS = float(os.getenv("REPLICA_HEALTH_SECONDS") or 10)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS") or 10)
+# Carries the read-your-writes deadline (unix time) back to the client, so
+# it holds whichever worker serves the next read.
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+
+
+class ReplicaSelector:
+    """Round-robin choice of a healthy student DB replica for reads.
+
+    Replica aliases come from ``settings.STUDENT_REPLICA_ALIASES``. A replica
+    is pinged at most once per ``health_seconds`` and skipped while it is
+    down; with no healthy replica reads go to the primary. Users that wrote
+    within the last ``ryw_seconds`` read from the primary so they never see
+    a replica that has not caught up with their own results: writes seen by
+    this process are remembered per user, and ``mark_response`` hands the
+    client a marker that sends its reads to the primary on any worker.
+    """
+
+    def __init__(
+        self,
+        primary: str = PRIMARY_ALIAS,
+        health_seconds: float = REPLICA_HEALTH_SECONDS,
+        ryw_seconds: float = READ_YOUR_WRITES_SECONDS,
+    ):
+        self.primary = primary
+        self.health_seconds = health_seconds
+        self.ryw_seconds = ryw_seconds
+        self._counter = itertools.count()
+        self._health: dict[str, tuple[bool, float]] = {}
+        self._recent_writes: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def replicas(self) -> list[str]:
+        return list(getattr(settings, "STUDENT_REPLICA_ALIASES", []))
+
+    def is_replica(self, alias: str) -> bool:
+        return alias in self.replicas()
+
+    def _ping(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except DatabaseError:
+            return False
+
+    def _healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            state = self._health.get(alias)
+        if state is not None and now - state[1] < self.health_seconds:
+            return state[0]
+        ok = self._ping(alias)
+        with self._lock:
+            self._health[alias] = (ok, now)
+        return ok
+
+    def mark_down(self, alias: str) -> None:
+        with self._lock:
+            self._health[alias] = (False, time.monotonic())
+
+    def note_writes(self, user_ids) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for user_id in user_ids:
+                self._recent_writes[user_id] = now
+            if len(self._recent_writes) > 10000:
+                cutoff = now - self.ryw_seconds
+                self._recent_writes = {
+                    user_id: at
+                    for user_id, at in self._recent_writes.items()
+                    if at > cutoff
+                }
+
+    def _wrote_recently(self, user_id: int) -> bool:
+        with self._lock:
+            at = self._recent_writes.get(user_id)
+        return at is not None and time.monotonic() - at < self.ryw_seconds
+
+    def mark_response(self, response) -> None:
+        """Send the client's reads to the primary for the next ``ryw_seconds``."""
+        until = f"{time.time() + self.ryw_seconds:.0f}"
+        response[READ_YOUR_WRITES_HEADER] = until
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            until,
+            max_age=math.ceil(self.ryw_seconds),
+            samesite="Lax",
+        )
+
+    def request_wrote_recently(self, request) -> bool:
+        """True if ``request`` carries an unexpired marker from ``mark_response``."""
+        raw = request.headers.get(READ_YOUR_WRITES_HEADER) or request.COOKIES.get(
+            READ_YOUR_WRITES_COOKIE
+        )
+        try:
+            remaining = float(raw) - time.time()
+        except (TypeError, ValueError):
+            return False
+        # A marker further out than one window was not issued by us.
+        return 0 < remaining <= self.ryw_seconds + 1
+
+    def read_alias(self, user_id: int | None = None, primary: bool = False) -> str:
+        if primary or (user_id is not None and self._wrote_recently(user_id)):
+            return self.primary
+
+        replicas = self.replicas()
+        for _ in range(len(replicas)):
+            alias = replicas[next(self._counter) % len(replicas)]
+            if self._healthy(alias):
+                return alias
+        return self.primary
+
+    def run_read(self, query, user_id: int | None = None, primary: bool = False):
+        """Call ``query(alias)`` on a replica, retrying on the primary if it fails.
+
+        ``primary`` forces the primary, e.g. for a request that carries a
+        read-your-writes marker.
+        """
+        alias = self.read_alias(user_id, primary)
+        if alias == self.primary:
+            return query(alias)
+        try:
+            return query(alias)
+        except DatabaseError:
+            self.mark_down(alias)
+            return query(self.primary)
+
+
+replica_selector = ReplicaSelector()
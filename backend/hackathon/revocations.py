@@ -0,0 +1,94 @@
+import hashlib
+import math
+import os
+import threading
+import time
+
+from django.utils import timezone
+
+from .models import AuthSession
+
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS") or 30)
+REVOCATION_FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex token hashes."""
+
+    def __init__(self, capacity: int, error_rate: float = REVOCATION_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1024)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationFilter:
+    """Revoked, unexpired session token hashes held in a Bloom filter.
+
+    The filter is rebuilt from AuthSession every ``refresh_seconds``;
+    logouts in this process are added immediately. A negative answer needs
+    no DB access; the rare positive is confirmed against AuthSession so a
+    false positive never rejects a valid token.
+    """
+
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._filter = BloomFilter(0)
+        self._loaded_at = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        token_hashes = list(
+            AuthSession.objects.filter(
+                revoked_at__isnull=False, expires_at__gt=timezone.now()
+            ).values_list("token_hash", flat=True)
+        )
+        bloom = BloomFilter(len(token_hashes) * 2)
+        for token_hash in token_hashes:
+            bloom.add(token_hash)
+        with self._lock:
+            self._filter = bloom
+            self._loaded_at = time.monotonic()
+            self._loaded = True
+
+    def _ensure_fresh(self) -> None:
+        if self._loaded and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            if not self._loaded:
+                raise
+            print(f"Error refreshing revocation filter: {str(e)}")
+            self._loaded_at = time.monotonic()
+
+    def add(self, token_hash: str) -> None:
+        with self._lock:
+            self._filter.add(token_hash)
+
+    def is_revoked(self, token_hash: str) -> bool:
+        self._ensure_fresh()
+        if token_hash not in self._filter:
+            return False
+        return AuthSession.objects.filter(
+            token_hash=token_hash, revoked_at__isnull=False
+        ).exists()
+
+
+revocation_filter = RevocationFilter()
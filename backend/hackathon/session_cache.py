@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils import timezone
+
+from .models import AuthSession
+
+
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS") or 60)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE") or 10000)
+
+
+class SessionCache:
+    """LRU cache of resolved sessions keyed by token hash.
+
+    An entry lives for at most ``ttl_seconds`` and never past the session's
+    ``expires_at``. Logout in this process invalidates the entry directly;
+    revocations made elsewhere take effect once the entry's TTL runs out.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_CACHE_TTL_SECONDS,
+        max_size: int = SESSION_CACHE_SIZE,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[AuthSession, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, token_hash: str) -> AuthSession | None:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                self._misses += 1
+                return None
+            session, deadline = entry
+            if time.monotonic() >= deadline:
+                del self._entries[token_hash]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(token_hash)
+            self._hits += 1
+            return session
+
+    def put(self, token_hash: str, session: AuthSession) -> None:
+        remaining = (session.expires_at - timezone.now()).total_seconds()
+        ttl = min(self.ttl_seconds, remaining)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token_hash] = (session, time.monotonic() + ttl)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, token_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+session_cache = SessionCache()
@@ -1,3 +1,99 @@
-from django.test import TestCase
+import os
+import random
+import threading
+import uuid
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connections
+from django.test import TransactionTestCase
+
+from .game_results import (
+    ROLLUP_GRANULARITIES,
+    bucket_start,
+    insert_results,
+    parse_result,
+)
+
+
+# The game results SQL names the team19 schema explicitly, so these tests run
+# against it (not a throwaway test database) and only when asked to.
+@skipUnless(os.getenv("RUN_DB_TESTS"), "set RUN_DB_TESTS=1 to run against team19")
+class ConcurrentIdempotencyKeyTests(TransactionTestCase):
+    databases = {"default", "student"}
+    workers = 8
+
+    def setUp(self):
+        self.user_id = random.randint(10**12, 10**13)
+        self.key = f"test-{uuid.uuid4().hex}"
+        self.payload = {
+            "user_id": self.user_id,
+            "total_score": 7.5,
+            "total_time_spent": 30,
+            "tasks_completed": 2,
+        }
+        self.inserted = []
+
+    def tearDown(self):
+        with connections["student"].cursor() as cursor:
+            for result in self.inserted:
+                for granularity in ROLLUP_GRANULARITIES:
+                    cursor.execute(
+                        """
+                        UPDATE team19.game_activity_rollups
+                        SET games = games - 1,
+                            total_score = total_score - %s,
+                            total_time = total_time - %s,
+                            total_tasks = total_tasks - %s,
+                            distinct_users = distinct_users - 1
+                        WHERE granularity = %s AND bucket_start = %s
+                        """,
+                        [
+                            result.total_score,
+                            result.total_time_spent,
+                            result.tasks_completed,
+                            granularity,
+                            bucket_start(result.created_at, granularity),
+                        ],
+                    )
+            for table in ("game_results", "game_user_stats", "game_activity_users"):
+                cursor.execute(
+                    f"DELETE FROM team19.{table} WHERE user_id = %s", [self.user_id]
+                )
+            cursor.execute(
+                "DELETE FROM team19.game_result_keys WHERE idempotency_key = %s",
+                [self.key],
+            )
+
+    def _submit(self, barrier: threading.Barrier, lock: threading.Lock) -> None:
+        try:
+            barrier.wait()
+            inserted = insert_results([parse_result(self.payload, self.key)])
+            with lock:
+                self.inserted.extend(inserted)
+        finally:
+            connections.close_all()
+
+    def test_parallel_submissions_with_same_key_write_once(self):
+        barrier = threading.Barrier(self.workers)
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self._submit, args=(barrier, lock))
+            for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.inserted), 1)
+        with connections["student"].cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM team19.game_results WHERE user_id = %s",
+                [self.user_id],
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute(
+                "SELECT total_games FROM team19.game_user_stats WHERE user_id = %s",
+                [self.user_id],
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
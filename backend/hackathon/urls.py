@@ -1,3 +1,5 @@
+import os
+
 from django.urls import path
 
 from .views import (
@@ -6,33 +8,77 @@ from .views import (
     ApiMeView,
     ApiOtpRequestView,
     ApiOtpVerifyView,
+    AsyncApiOtpRequestView,
+    AsyncApiOtpVerifyView,
     HealthView,
 )
 from . import views_vocab
 from . import views_game_results  # ADD THIS LINE
+from . import views_metrics
+
+
+# Serve the OTP endpoints from async views when running under ASGI.
+if (os.getenv("OTP_VIEWS_ASYNC") or "").strip().lower() in {"1", "true", "yes", "on"}:
+    otp_request_view = AsyncApiOtpRequestView.as_view()
+    otp_verify_view = AsyncApiOtpVerifyView.as_view()
+else:
+    otp_request_view = ApiOtpRequestView.as_view()
+    otp_verify_view = ApiOtpVerifyView.as_view()
 
 
 urlpatterns = [
     path("", HealthView.as_view(), name="health"),
     path("api/login", ApiLoginView.as_view(), name="api_login"),
-    path("api/otp/request", ApiOtpRequestView.as_view(), name="api_otp_request"),
-    path("api/otp/verify", ApiOtpVerifyView.as_view(), name="api_otp_verify"),
+    path("api/otp/request", otp_request_view, name="api_otp_request"),
+    path("api/otp/verify", otp_verify_view, name="api_otp_verify"),
     path("api/me", ApiMeView.as_view(), name="api_me"),
+    path("api/metrics/", views_metrics.metrics, name="metrics"),
     path("api/logout", ApiLogoutView.as_view(), name="api_logout"),
     path("api/vocab/next/", views_vocab.next_vocab_word, name="next-vocab-word"),
+    path("api/vocab/batch/", views_vocab.vocab_batch, name="vocab-batch"),
     path(
         "api/game-results/",
         views_game_results.save_game_results,
         name="save_game_results",
     ),
+    path(
+        "api/game-results/bulk/",
+        views_game_results.save_game_results_bulk,
+        name="save_game_results_bulk",
+    ),
+    path(
+        "api/game-results/export/",
+        views_game_results.export_game_results,
+        name="export_game_results",
+    ),
     path(
         "api/game-results/<int:user_id>/",
         views_game_results.get_user_game_results,
         name="get_user_game_results",
     ),
+    path(
+        "api/game-stats/timeseries/",
+        views_game_results.get_game_timeseries,
+        name="get_game_timeseries",
+    ),
     path(
         "api/game-stats/<int:user_id>/",
         views_game_results.get_game_stats,
         name="get_game_stats",
     ),
+    path(
+        "api/leaderboard/",
+        views_game_results.get_leaderboard,
+        name="get_leaderboard",
+    ),
+    path(
+        "api/leaderboard/rank/<int:user_id>/",
+        views_game_results.get_leaderboard_rank,
+        name="get_leaderboard_rank",
+    ),
+    path(
+        "api/leaderboard/team/<int:team_no>/",
+        views_game_results.get_leaderboard_team_rank,
+        name="get_leaderboard_team_rank",
+    ),
 ]
@@ -2,22 +2,39 @@ import json
 import re
 from datetime import timedelta
 
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest, JsonResponse
 from django.db import transaction
+from django.db.models import F, QuerySet
 from django.utils import timezone
 from django.views import View
 
 from .auth import (
+    AUTH_TOKEN_MODE,
+    OTP_MAX_ATTEMPTS,
+    OTP_MODE,
+    create_otp_code,
     create_session_token,
+    create_signed_session_token,
+    is_signed_session_token,
     OtpDispatchError,
     OtpVerifyError,
+    SessionTimes,
     get_session_times,
+    hash_otp_code,
     hash_session_token,
+    adispatch_otp,
+    averify_otp_via_gateway,
     dispatch_otp,
+    verify_otp_code,
     verify_otp_via_gateway,
-    verify_password,
+    verify_signed_session_token,
 )
 from .models import AppUser, AppUserMember, AuthSession, OtpChallenge
+from .password_workers import PasswordPoolSaturated, verify_user_password
+from .revocations import revocation_filter
+from .session_cache import session_cache
+from .vocab_sessions import vocab_sequencer
 
 
 def _normalize_phone(raw: str) -> str:
@@ -43,7 +60,14 @@ def _get_session(request: HttpRequest) -> AuthSession | None:
         return None
 
     token_hash = hash_session_token(token)
-    return (
+    if is_signed_session_token(token):
+        return _get_signed_session(token, token_hash)
+
+    session = session_cache.get(token_hash)
+    if session is not None:
+        return session
+
+    session = (
         AuthSession.objects.select_related("user", "member")
         .filter(
             token_hash=token_hash,
@@ -52,6 +76,62 @@ def _get_session(request: HttpRequest) -> AuthSession | None:
         )
         .first()
     )
+    if session is not None:
+        session_cache.put(token_hash, session)
+    return session
+
+
+def _get_signed_session(token: str, token_hash: str) -> AuthSession | None:
+    # Signature, expiry and revocation are checked in memory; the DB is only
+    # read to load the user and member on a session cache miss.
+    claims = verify_signed_session_token(token)
+    if claims is None or revocation_filter.is_revoked(token_hash):
+        return None
+
+    session = session_cache.get(token_hash)
+    if session is not None:
+        return session
+
+    user = AppUser.objects.filter(id=claims.user_id).first()
+    if user is None:
+        return None
+
+    member = None
+    if claims.member_id is not None:
+        member = AppUserMember.objects.filter(id=claims.member_id, user=user).first()
+        if member is None:
+            return None
+
+    session = AuthSession(
+        user=user,
+        member=member,
+        token_hash=token_hash,
+        expires_at=claims.expires_at,
+    )
+    session_cache.put(token_hash, session)
+    return session
+
+
+def _issue_session(user: AppUser, member: AppUserMember | None) -> tuple[str, SessionTimes]:
+    times = get_session_times()
+    if AUTH_TOKEN_MODE == "signed":
+        raw_token = create_signed_session_token(
+            user_id=user.id,
+            member_id=member.id if member is not None else None,
+            expires_at=times.expires_at,
+        )
+    else:
+        raw_token = create_session_token()
+
+    # Signed sessions are recorded too, so they can be revoked and audited.
+    AuthSession.objects.create(
+        user=user,
+        member=member,
+        token_hash=hash_session_token(raw_token),
+        created_at=times.created_at,
+        expires_at=times.expires_at,
+    )
+    return raw_token, times
 
 
 def _json_body(request: HttpRequest) -> dict:
@@ -96,34 +176,41 @@ class ApiLoginView(View):
         if not members:
             return JsonResponse({"error": "Invalid username or password."}, status=401)
 
-        matched_user: AppUser | None = None
-        matched_member: AppUserMember | None = None
+        # Members of the same team share one credential; verify each distinct
+        # credential once and take the first member that carries it.
+        candidates: dict[tuple, AppUserMember] = {}
         for member in members:
             user = member.user
-            if verify_password(
-                password,
-                salt_b64=user.password_salt_b64,
-                password_hash_b64=user.password_hash_b64,
-                iterations=user.password_iterations,
-            ):
-                matched_user = user
-                matched_member = member
-                break
+            credential = (
+                user.id,
+                user.password_salt_b64,
+                user.password_hash_b64,
+                user.password_iterations,
+            )
+            candidates.setdefault(credential, member)
+
+        matched_user: AppUser | None = None
+        matched_member: AppUserMember | None = None
+        try:
+            for member in candidates.values():
+                if verify_user_password(member.user, password):
+                    matched_user = member.user
+                    matched_member = member
+                    break
+        except PasswordPoolSaturated:
+            response = JsonResponse(
+                {"error": "Too many login attempts right now. Please try again."},
+                status=503,
+            )
+            response["Retry-After"] = "1"
+            return response
 
         if matched_user is None:
             return JsonResponse({"error": "Invalid username or password."}, status=401)
 
         user = matched_user
 
-        raw_token = create_session_token()
-        times = get_session_times()
-        AuthSession.objects.create(
-            user=user,
-            member=matched_member,
-            token_hash=hash_session_token(raw_token),
-            created_at=times.created_at,
-            expires_at=times.expires_at,
-        )
+        raw_token, times = _issue_session(user, matched_member)
 
         return JsonResponse(
             {
@@ -169,163 +256,316 @@ class ApiLogoutView(View):
         if session is None:
             return JsonResponse({"ok": True})
 
-        session.revoked_at = timezone.now()
-        session.save(update_fields=["revoked_at"])
+        AuthSession.objects.filter(
+            token_hash=session.token_hash, revoked_at__isnull=True
+        ).update(revoked_at=timezone.now())
+        session_cache.invalidate(session.token_hash)
+        revocation_filter.add(session.token_hash)
+        vocab_sequencer.forget(session.token_hash)
         return JsonResponse({"ok": True})
 
 
-class ApiOtpRequestView(View):
-    OTP_TTL = timedelta(minutes=5)
+OTP_TTL = timedelta(minutes=5)
 
-    def post(self, request: HttpRequest) -> JsonResponse:
-        payload = _json_body(request)
-        channel = (payload.get("channel") or "").strip().lower()
-        phone = _normalize_phone(payload.get("phone") or payload.get("username") or "")
-        email = (payload.get("email") or payload.get("username") or "").strip()
-        team_no_raw = payload.get("team_no")
 
-        if channel not in {"whatsapp", "email"}:
-            return JsonResponse({"error": "Invalid OTP channel."}, status=400)
+def _otp_request_target(
+    payload: dict,
+) -> tuple[str, str, str, QuerySet] | JsonResponse:
+    """Validate an OTP request and build the query for matching members.
+
+    Returns ``(channel, phone, email, members_qs)`` or an error response.
+    """
+    channel = (payload.get("channel") or "").strip().lower()
+    phone = _normalize_phone(payload.get("phone") or payload.get("username") or "")
+    email = (payload.get("email") or payload.get("username") or "").strip()
+    team_no_raw = payload.get("team_no")
+
+    if channel not in {"whatsapp", "email"}:
+        return JsonResponse({"error": "Invalid OTP channel."}, status=400)
+
+    if channel == "whatsapp" and not phone:
+        return JsonResponse({"error": "Please enter mobile number."}, status=400)
+    if channel == "email" and not email:
+        return JsonResponse({"error": "Please enter email id."}, status=400)
 
-        if channel == "whatsapp" and not phone:
-            return JsonResponse({"error": "Please enter mobile number."}, status=400)
-        if channel == "email" and not email:
-            return JsonResponse({"error": "Please enter email id."}, status=400)
+    if channel == "whatsapp":
+        members_qs = (
+            AppUserMember.objects.select_related("user")
+            .filter(phone=phone)
+            .filter(user__is_active=True)
+        )
+    else:
+        members_qs = (
+            AppUserMember.objects.select_related("user")
+            .filter(email__iexact=email)
+            .filter(user__is_active=True)
+        )
+
+    if team_no_raw is not None and str(team_no_raw).strip() != "":
+        try:
+            team_no = int(team_no_raw)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid team number."}, status=400)
+        members_qs = members_qs.filter(user__team_no=team_no)
 
+    return channel, phone, email, members_qs
+
+
+def _otp_member_error(channel: str, members: list[AppUserMember]) -> JsonResponse | None:
+    if not members:
         if channel == "whatsapp":
-            members_qs = (
-                AppUserMember.objects.select_related("user")
-                .filter(phone=phone)
-                .filter(user__is_active=True)
-            )
-        else:
-            members_qs = (
-                AppUserMember.objects.select_related("user")
-                .filter(email__iexact=email)
-                .filter(user__is_active=True)
-            )
+            return JsonResponse({"error": "Mobile number not registered."}, status=404)
+        return JsonResponse({"error": "Email id not registered."}, status=404)
+
+    if len(members) > 1:
+        identifier_label = "mobile number" if channel == "whatsapp" else "email id"
+        teams = []
+        for m in members:
+            teams.append({"team_no": m.user.team_no, "username": m.user.username})
+        teams = sorted(teams, key=lambda t: (t["team_no"] is None, t["team_no"] or 0))
+        return JsonResponse(
+            {
+                "error": f"Multiple team accounts found for this {identifier_label}. Please select team number.",
+                "teams": teams,
+            },
+            status=409,
+        )
+    return None
+
+
+def _new_otp_code() -> tuple[str | None, dict]:
+    """Return a fresh code and the hash fields to store on its challenge.
+
+    Outside local mode the gateway generates the code, so nothing is stored.
+    """
+    if OTP_MODE != "local":
+        return None, {}
+    code = create_otp_code()
+    salt_b64, hash_b64, iterations = hash_otp_code(code)
+    return code, {
+        "otp_salt_b64": salt_b64,
+        "otp_hash_b64": hash_b64,
+        "otp_iterations": iterations,
+    }
+
+
+def _create_otp_challenge(
+    member: AppUserMember, identifier: str, otp_fields: dict
+) -> JsonResponse:
+    now = timezone.now()
+    expires_at = now + OTP_TTL
+
+    with transaction.atomic():
+        OtpChallenge.objects.filter(
+            member=member,
+            identifier=identifier,
+            consumed_at__isnull=True,
+            expires_at__gt=now,
+        ).update(consumed_at=now)
+
+        challenge = OtpChallenge.objects.create(
+            identifier=identifier,
+            member=member,
+            created_at=now,
+            expires_at=expires_at,
+            **otp_fields,
+        )
 
-        if team_no_raw is not None and str(team_no_raw).strip() != "":
-            try:
-                team_no = int(team_no_raw)
-            except (TypeError, ValueError):
-                return JsonResponse({"error": "Invalid team number."}, status=400)
-            members_qs = members_qs.filter(user__team_no=team_no)
+    return JsonResponse(
+        {"challenge_id": challenge.id, "expires_at": expires_at.isoformat()}
+    )
+
+
+def _otp_verify_target(payload: dict) -> tuple[QuerySet, str] | JsonResponse:
+    """Return ``(challenge_qs, otp)`` for a verify request, or an error response."""
+    challenge_id = payload.get("challenge_id")
+    otp = (payload.get("otp") or "").strip()
+
+    if not challenge_id or not otp:
+        return JsonResponse({"error": "Please enter OTP."}, status=400)
+
+    try:
+        challenge_id_int = int(challenge_id)
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid OTP request."}, status=400)
+
+    challenge_qs = OtpChallenge.objects.select_related("member", "member__user").filter(
+        id=challenge_id_int
+    )
+    return challenge_qs, otp
+
+
+def _otp_attempt_qs(challenge: OtpChallenge) -> QuerySet:
+    # Counting the attempt before checking the code caps guesses even under
+    # concurrent requests for the same challenge.
+    return OtpChallenge.objects.filter(
+        id=challenge.id, consumed_at__isnull=True, attempts__lt=OTP_MAX_ATTEMPTS
+    )
+
+
+def _matches_local_otp(challenge: OtpChallenge, otp: str) -> bool:
+    return verify_otp_code(
+        otp,
+        salt_b64=challenge.otp_salt_b64,
+        otp_hash_b64=challenge.otp_hash_b64,
+        iterations=challenge.otp_iterations,
+    )
+
+
+def _too_many_otp_attempts() -> JsonResponse:
+    return JsonResponse(
+        {"error": "Too many incorrect attempts. Please request a new OTP."},
+        status=429,
+    )
+
+
+def _complete_otp_login(challenge: OtpChallenge) -> JsonResponse:
+    now = timezone.now()
+
+    with transaction.atomic():
+        updated = OtpChallenge.objects.filter(
+            id=challenge.id, consumed_at__isnull=True
+        ).update(consumed_at=now)
+        if updated != 1:
+            return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
+
+        member = challenge.member
+        user = member.user
+
+        raw_token, times = _issue_session(user, member)
+
+    return JsonResponse(
+        {
+            "token": raw_token,
+            "expires_at": times.expires_at.isoformat(),
+            "user": {"id": user.id, "username": user.username},
+        }
+    )
+
+
+class ApiOtpRequestView(View):
+    def post(self, request: HttpRequest) -> JsonResponse:
+        target = _otp_request_target(_json_body(request))
+        if isinstance(target, JsonResponse):
+            return target
+        channel, phone, email, members_qs = target
 
         members = list(members_qs)
-        if not members:
-            if channel == "whatsapp":
-                return JsonResponse(
-                    {"error": "Mobile number not registered."}, status=404
-                )
-            return JsonResponse({"error": "Email id not registered."}, status=404)
-
-        if len(members) > 1:
-            identifier_label = "mobile number" if channel == "whatsapp" else "email id"
-            teams = []
-            for m in members:
-                teams.append({"team_no": m.user.team_no, "username": m.user.username})
-            teams = sorted(
-                teams, key=lambda t: (t["team_no"] is None, t["team_no"] or 0)
-            )
-            return JsonResponse(
-                {
-                    "error": f"Multiple team accounts found for this {identifier_label}. Please select team number.",
-                    "teams": teams,
-                },
-                status=409,
-            )
+        error = _otp_member_error(channel, members)
+        if error is not None:
+            return error
 
         member = members[0]
 
         identifier = phone if channel == "whatsapp" else (member.email or email)
+        code, otp_fields = _new_otp_code()
 
         try:
             dispatch_otp(
-                channel=channel, identifier=identifier, display_name=member.name
+                channel=channel,
+                identifier=identifier,
+                otp=code,
+                display_name=member.name,
             )
         except OtpDispatchError as exc:
             return JsonResponse({"error": str(exc)}, status=502)
 
-        now = timezone.now()
-        expires_at = now + self.OTP_TTL
-
-        with transaction.atomic():
-            OtpChallenge.objects.filter(
-                member=member,
-                identifier=identifier,
-                consumed_at__isnull=True,
-                expires_at__gt=now,
-            ).update(consumed_at=now)
-
-            challenge = OtpChallenge.objects.create(
-                identifier=identifier,
-                member=member,
-                created_at=now,
-                expires_at=expires_at,
-            )
-
-        return JsonResponse(
-            {"challenge_id": challenge.id, "expires_at": expires_at.isoformat()}
-        )
+        return _create_otp_challenge(member, identifier, otp_fields)
 
 
 class ApiOtpVerifyView(View):
     def post(self, request: HttpRequest) -> JsonResponse:
-        payload = _json_body(request)
-        challenge_id = payload.get("challenge_id")
-        otp = (payload.get("otp") or "").strip()
-
-        if not challenge_id or not otp:
-            return JsonResponse({"error": "Please enter OTP."}, status=400)
-
-        try:
-            challenge_id_int = int(challenge_id)
-        except (TypeError, ValueError):
-            return JsonResponse({"error": "Invalid OTP request."}, status=400)
+        target = _otp_verify_target(_json_body(request))
+        if isinstance(target, JsonResponse):
+            return target
+        challenge_qs, otp = target
 
-        challenge = (
-            OtpChallenge.objects.select_related("member", "member__user")
-            .filter(id=challenge_id_int)
-            .first()
-        )
+        challenge = challenge_qs.first()
         if challenge is None or not challenge.is_valid() or challenge.member is None:
             return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
 
-        try:
-            ok = verify_otp_via_gateway(identifier=challenge.identifier, otp=otp)
-        except OtpVerifyError as exc:
-            return JsonResponse({"error": str(exc)}, status=502)
+        if challenge.otp_hash_b64:
+            if _otp_attempt_qs(challenge).update(attempts=F("attempts") + 1) != 1:
+                return _too_many_otp_attempts()
+            ok = _matches_local_otp(challenge, otp)
+        else:
+            try:
+                ok = verify_otp_via_gateway(identifier=challenge.identifier, otp=otp)
+            except OtpVerifyError as exc:
+                return JsonResponse({"error": str(exc)}, status=502)
 
         if not ok:
             return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
 
-        now = timezone.now()
+        return _complete_otp_login(challenge)
 
-        with transaction.atomic():
-            updated = OtpChallenge.objects.filter(
-                id=challenge.id, consumed_at__isnull=True
-            ).update(consumed_at=now)
-            if updated != 1:
-                return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
 
-            member = challenge.member
-            user = member.user
+# Async variants for the ASGI stack: the gateway call is awaited instead of
+# holding a worker thread, reads use the async ORM API and the transactional
+# writes run through sync_to_async.
+
+
+class AsyncApiOtpRequestView(View):
+    async def post(self, request: HttpRequest) -> JsonResponse:
+        target = _otp_request_target(_json_body(request))
+        if isinstance(target, JsonResponse):
+            return target
+        channel, phone, email, members_qs = target
 
-            raw_token = create_session_token()
-            times = get_session_times()
-            AuthSession.objects.create(
-                user=user,
-                member=member,
-                token_hash=hash_session_token(raw_token),
-                created_at=times.created_at,
-                expires_at=times.expires_at,
+        members = [member async for member in members_qs]
+        error = _otp_member_error(channel, members)
+        if error is not None:
+            return error
+
+        member = members[0]
+
+        identifier = phone if channel == "whatsapp" else (member.email or email)
+        # Hashing is CPU-bound and touches no connections, so it need not
+        # share the ORM's thread.
+        code, otp_fields = await sync_to_async(_new_otp_code, thread_sensitive=False)()
+
+        try:
+            await adispatch_otp(
+                channel=channel,
+                identifier=identifier,
+                otp=code,
+                display_name=member.name,
             )
+        except OtpDispatchError as exc:
+            return JsonResponse({"error": str(exc)}, status=502)
 
-        return JsonResponse(
-            {
-                "token": raw_token,
-                "expires_at": times.expires_at.isoformat(),
-                "user": {"id": user.id, "username": user.username},
-            }
+        return await sync_to_async(_create_otp_challenge)(
+            member, identifier, otp_fields
         )
+
+
+class AsyncApiOtpVerifyView(View):
+    async def post(self, request: HttpRequest) -> JsonResponse:
+        target = _otp_verify_target(_json_body(request))
+        if isinstance(target, JsonResponse):
+            return target
+        challenge_qs, otp = target
+
+        challenge = await challenge_qs.afirst()
+        if challenge is None or not challenge.is_valid() or challenge.member is None:
+            return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
+
+        if challenge.otp_hash_b64:
+            attempt_qs = _otp_attempt_qs(challenge)
+            if await attempt_qs.aupdate(attempts=F("attempts") + 1) != 1:
+                return _too_many_otp_attempts()
+            ok = await sync_to_async(_matches_local_otp, thread_sensitive=False)(
+                challenge, otp
+            )
+        else:
+            try:
+                ok = await averify_otp_via_gateway(
+                    identifier=challenge.identifier, otp=otp
+                )
+            except OtpVerifyError as exc:
+                return JsonResponse({"error": str(exc)}, status=502)
+
+        if not ok:
+            return JsonResponse({"error": "Invalid or expired OTP."}, status=401)
+
+        return await sync_to_async(_complete_otp_login)(challenge)
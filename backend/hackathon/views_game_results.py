@@ -1,14 +1,48 @@
+import hmac
+import os
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.utils import timezone
 from django.db import connections
-from datetime import datetime
-from datetime import datetime
-from pytz import timezone as pytz_timezone
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .game_results import (
+    decode_page_cursor,
+    encode_page_cursor,
+    ROLLUP_GRANULARITIES,
+    clean_idempotency_key,
+    insert_results,
+    missing_fields,
+    parse_result,
+    recent_result_keys,
+)
+from .game_results_export import EXPORT_FORMATS, ExportBusy, open_export
+from .game_results_buffer import GAME_RESULTS_WRITE_BEHIND, game_results_buffer
+from .leaderboard import leaderboard
+from .models import AppUser
+from .replicas import replica_selector
+from .views import _get_bearer_token
+
+
+MAX_BULK_RESULTS = 1000
+MAX_LEADERBOARD_SIZE = 100
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_TIMESERIES_BUCKETS = 1000
+
+
+def _duplicate_response() -> Response:
+    return Response(
+        {
+            "success": True,
+            "duplicate": True,
+            "message": "Game results already saved",
+        },
+        status=200,
+    )
 
-# Set your desired timezone, e.g., Asia/Kolkata
-india_time = datetime.now(pytz_timezone('Asia/Kolkata'))
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
@@ -25,72 +59,67 @@ def save_game_results(request):
         "total_time_spent": 120,
         "tasks_completed": 2
     }
+
+    Retries are deduplicated when the client sends an Idempotency-Key header
+    (or a "result_id" field) that stays the same across attempts.
     """
     try:
-        # Get data from request
-        user_id = request.data.get("user_id")
-        total_score = request.data.get("total_score")
-        total_time_spent = request.data.get("total_time_spent")
-        tasks_completed = request.data.get("tasks_completed")
-
         # Validation - allow 0 values, just check for None
-        if (
-            user_id is None
-            or total_score is None
-            or total_time_spent is None
-            or tasks_completed is None
-        ):
+        if missing_fields(request.data):
             return Response(
                 {
                     "success": False,
                     "message": "Missing required fields: user_id, total_score, total_time_spent, tasks_completed",
                     "received": {
-                        "user_id": user_id,
-                        "total_score": total_score,
-                        "total_time_spent": total_time_spent,
-                        "tasks_completed": tasks_completed,
+                        "user_id": request.data.get("user_id"),
+                        "total_score": request.data.get("total_score"),
+                        "total_time_spent": request.data.get("total_time_spent"),
+                        "tasks_completed": request.data.get("tasks_completed"),
                     },
                 },
                 status=400,
             )
 
+        idempotency_key = clean_idempotency_key(
+            request.headers.get("Idempotency-Key") or request.data.get("result_id")
+        )
+        if idempotency_key is not None and idempotency_key in recent_result_keys:
+            return _duplicate_response()
+
         # Convert to proper types
-        user_id = int(user_id)
-        total_score = float(total_score)
-        total_time_spent = int(total_time_spent)
-        tasks_completed = int(tasks_completed)
+        result = parse_result(request.data, idempotency_key)
+
+        # In write-behind mode the result is queued and written in a batch by
+        # the flusher thread; a full queue falls back to a direct insert.
+        if GAME_RESULTS_WRITE_BEHIND and game_results_buffer.enqueue(result):
+            if idempotency_key is not None:
+                recent_result_keys.add([idempotency_key])
+            response = Response(
+                {
+                    "success": True,
+                    "message": "Game results queued",
+                    "data": result.as_dict(),
+                },
+                status=202,
+            )
+            replica_selector.mark_response(response)
+            return response
 
         # Insert into database using raw SQL (team19 schema)
         # Use 'student' database connection instead of default
-        with connections["student"].cursor() as cursor:
-            cursor.execute(
-                """
-                INSERT INTO team19.game_results 
-                (user_id, total_score, total_time_spent, tasks_completed, created_at)
-                VALUES (%s, %s, %s, %s, %s)
-            """,
-                [
-                    user_id,
-                    total_score,
-                    total_time_spent,
-                    tasks_completed,
-                    india_time,
-                ],
-            )
+        if not insert_results([result]):
+            return _duplicate_response()
 
-        return Response(
+        response = Response(
             {
                 "success": True,
                 "message": "Game results saved successfully",
-                "data": {
-                    "user_id": user_id,
-                    "total_score": total_score,
-                    "total_time_spent": total_time_spent,
-                    "tasks_completed": tasks_completed,
-                },
+                "data": result.as_dict(),
             },
             status=201,
         )
+        replica_selector.mark_response(response)
+        return response
 
     except ValueError as e:
         return Response(
@@ -101,33 +130,168 @@ def save_game_results(request):
         return Response({"success": False, "message": f"Error: {str(e)}"}, status=500)
 
 
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def save_game_results_bulk(request):
+    """
+    Save many game results in one request, e.g. when a client replays
+    results recorded while offline. All valid items are inserted in a single
+    transaction; invalid items are reported and skipped. Items carrying a
+    "result_id" that was already saved are reported as duplicates.
+
+    Expected JSON:
+    {
+        "results": [
+            {"user_id": 1, "total_score": 5.3, "total_time_spent": 120, "tasks_completed": 2},
+            ...
+        ]
+    }
+    """
+    items = request.data.get("results") if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"success": False, "message": "Expected a non-empty list of results"},
+            status=400,
+        )
+    if len(items) > MAX_BULK_RESULTS:
+        return Response(
+            {
+                "success": False,
+                "message": f"At most {MAX_BULK_RESULTS} results per request",
+            },
+            status=400,
+        )
+
+    statuses = []
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            statuses.append(
+                {"index": index, "status": "invalid", "message": "Expected an object"}
+            )
+            continue
+
+        missing = missing_fields(item)
+        if missing:
+            statuses.append(
+                {
+                    "index": index,
+                    "status": "invalid",
+                    "message": f"Missing required fields: {', '.join(missing)}",
+                }
+            )
+            continue
+
+        try:
+            idempotency_key = clean_idempotency_key(item.get("result_id"))
+            result = parse_result(item, idempotency_key)
+        except (TypeError, ValueError) as e:
+            statuses.append(
+                {
+                    "index": index,
+                    "status": "invalid",
+                    "message": f"Invalid data type: {str(e)}",
+                }
+            )
+            continue
+
+        if idempotency_key is not None and idempotency_key in recent_result_keys:
+            statuses.append({"index": index, "status": "duplicate"})
+            continue
+
+        valid.append((index, result))
+        statuses.append({"index": index, "status": "created"})
+
+    try:
+        inserted = insert_results([result for _, result in valid])
+    except Exception as e:
+        print(f"Error saving game results: {str(e)}")
+        return Response({"success": False, "message": f"Error: {str(e)}"}, status=500)
+
+    inserted_ids = {id(result) for result in inserted}
+    for index, result in valid:
+        if id(result) not in inserted_ids:
+            statuses[index]["status"] = "duplicate"
+
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    for status in statuses:
+        counts[status["status"]] += 1
+
+    response = Response(
+        {
+            "success": counts["invalid"] < len(items),
+            **counts,
+            "results": statuses,
+        },
+        status=400 if counts["invalid"] == len(items) else 201,
+    )
+    if inserted:
+        replica_selector.mark_response(response)
+    return response
+
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_user_game_results(request, user_id):
     """
-    Get all game results for a specific user
-    Uses 'student' database connection
+    Get a page of game results for a specific user, newest first
+    Pass the returned next_cursor as ?after= to fetch the following page
+    Reads from a student DB replica when configured
     """
     try:
-        with connections["student"].cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT id, user_id, total_score, total_time_spent, 
-                       tasks_completed, created_at
-                FROM team19.game_results
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-            """,
-                [user_id],
-            )
+        limit = int(request.query_params.get("limit") or DEFAULT_PAGE_SIZE)
+        after = request.query_params.get("after")
+        after_key = decode_page_cursor(after) if after else None
+    except ValueError as e:
+        return Response({"success": False, "message": str(e)}, status=400)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-            columns = [col[0] for col in cursor.description]
-            results = []
+    try:
+        # Keyset pagination on (created_at, id) served by the
+        # (user_id, created_at, id) index: every page is an index range scan.
+        where = "WHERE user_id = %s"
+        params = [user_id]
+        if after_key is not None:
+            where += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            params += [after_key[0], after_key[0], after_key[1]]
+
+        def query(alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT id, user_id, total_score, total_time_spent,
+                           tasks_completed, created_at
+                    FROM team19.game_results
+                    {where}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """,
+                    params + [limit + 1],
+                )
+
+                columns = [col[0] for col in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        results = replica_selector.run_read(
+            query, user_id, primary=replica_selector.request_wrote_recently(request)
+        )
 
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
+        has_more = len(results) > limit
+        results = results[:limit]
+        next_cursor = None
+        if has_more:
+            last = results[-1]
+            next_cursor = encode_page_cursor(last["created_at"], last["id"])
 
-        return Response({"success": True, "data": results, "count": len(results)})
+        return Response(
+            {
+                "success": True,
+                "data": results,
+                "count": len(results),
+                "has_more": has_more,
+                "next_cursor": next_cursor,
+            }
+        )
 
     except Exception as e:
         return Response({"success": False, "message": str(e)}, status=500)
@@ -138,29 +302,226 @@ def get_user_game_results(request, user_id):
 def get_game_stats(request, user_id):
     """
     Get aggregated stats for a user
-    Uses 'student' database connection
+    Reads the running totals kept in team19.game_user_stats
+    Reads from a student DB replica when configured
     """
     try:
-        with connections["student"].cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT 
-                    COUNT(*) as total_games,
-                    AVG(total_score) as avg_score,
-                    MAX(total_score) as best_score,
-                    SUM(total_time_spent) as total_time,
-                    SUM(tasks_completed) as total_tasks
-                FROM team19.game_results
-                WHERE user_id = %s
-            """,
-                [user_id],
-            )
+        def query(alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT
+                        total_games,
+                        total_score / total_games as avg_score,
+                        best_score,
+                        total_time,
+                        total_tasks
+                    FROM team19.game_user_stats
+                    WHERE user_id = %s
+                """,
+                    [user_id],
+                )
+
+                columns = [col[0] for col in cursor.description]
+                return columns, cursor.fetchone()
+
+        columns, row = replica_selector.run_read(
+            query, user_id, primary=replica_selector.request_wrote_recently(request)
+        )
 
-            columns = [col[0] for col in cursor.description]
-            row = cursor.fetchone()
+        if row is None:
+            stats = dict.fromkeys(columns)
+            stats["total_games"] = 0
+        else:
             stats = dict(zip(columns, row))
 
         return Response({"success": True, "data": stats})
 
     except Exception as e:
         return Response({"success": False, "message": str(e)}, status=500)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_game_timeseries(request):
+    """
+    Get hourly or daily play volume from the activity rollups
+    ?granularity=hour|day, optional ?start= and ?end= (YYYY-MM-DD[ HH:MM:SS])
+    Never reads team19.game_results
+    """
+    granularity = (request.query_params.get("granularity") or "day").strip().lower()
+    if granularity not in ROLLUP_GRANULARITIES:
+        return Response(
+            {
+                "success": False,
+                "message": f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}",
+            },
+            status=400,
+        )
+
+    where = "WHERE granularity = %s"
+    params = [granularity]
+    start = request.query_params.get("start")
+    end = request.query_params.get("end")
+    if start:
+        where += " AND bucket_start >= %s"
+        params.append(start)
+    if end:
+        where += " AND bucket_start < %s"
+        params.append(end)
+
+    try:
+        def query(alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT bucket_start, games, total_score, total_time,
+                           total_tasks, distinct_users
+                    FROM team19.game_activity_rollups
+                    {where}
+                    ORDER BY bucket_start DESC
+                    LIMIT %s
+                """,
+                    params + [MAX_TIMESERIES_BUCKETS],
+                )
+
+                columns = [col[0] for col in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        buckets = replica_selector.run_read(
+            query, primary=replica_selector.request_wrote_recently(request)
+        )
+
+        buckets.reverse()
+        return Response(
+            {
+                "success": True,
+                "granularity": granularity,
+                "data": buckets,
+                "count": len(buckets),
+            }
+        )
+
+    except Exception as e:
+        return Response({"success": False, "message": str(e)}, status=500)
+
+
+def _with_teams(entries: list[dict]) -> list[dict]:
+    teams = {
+        user["id"]: user
+        for user in AppUser.objects.filter(
+            id__in=[entry["user_id"] for entry in entries]
+        ).values("id", "team_no", "username")
+    }
+    for entry in entries:
+        team = teams.get(entry["user_id"], {})
+        entry["team_no"] = team.get("team_no")
+        entry["username"] = team.get("username")
+    return entries
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_leaderboard(request):
+    """
+    Get the top users by total score
+    Served from the in-memory leaderboard
+    """
+    try:
+        k = int(request.query_params.get("k") or 10)
+    except ValueError:
+        return Response({"success": False, "message": "k must be an integer"}, status=400)
+    k = max(1, min(k, MAX_LEADERBOARD_SIZE))
+
+    try:
+        entries = _with_teams(leaderboard.top(k))
+        return Response({"success": True, "data": entries, "count": len(entries)})
+
+    except Exception as e:
+        return Response({"success": False, "message": str(e)}, status=500)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_leaderboard_rank(request, user_id):
+    """
+    Get a user's rank on the leaderboard
+    Served from the in-memory leaderboard
+    """
+    try:
+        entry = leaderboard.rank(user_id)
+        if entry is None:
+            return Response(
+                {"success": False, "message": "No results for this user"}, status=404
+            )
+        return Response({"success": True, "data": _with_teams([entry])[0]})
+
+    except Exception as e:
+        return Response({"success": False, "message": str(e)}, status=500)
+
+
+@require_GET
+def export_game_results(request):
+    """
+    Stream every row of team19.game_results as NDJSON or CSV
+    ?format=ndjson|csv, ?gzip=1 to compress on the fly
+    Requires "Authorization: Bearer <GAME_RESULTS_EXPORT_TOKEN>"; disabled
+    when that variable is unset
+    """
+    export_token = (os.getenv("GAME_RESULTS_EXPORT_TOKEN") or "").strip()
+    token = _get_bearer_token(request)
+    if not export_token or token is None or not hmac.compare_digest(
+        token.encode("utf-8"), export_token.encode("utf-8")
+    ):
+        return JsonResponse({"success": False, "message": "Forbidden"}, status=403)
+
+    fmt = (request.GET.get("format") or "ndjson").strip().lower()
+    gzip = request.GET.get("gzip") in {"1", "true", "yes"}
+
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse(
+            {
+                "success": False,
+                "message": f"format must be one of {', '.join(EXPORT_FORMATS)}",
+            },
+            status=400,
+        )
+
+    try:
+        stream = open_export(fmt, gzip=gzip)
+    except ExportBusy as e:
+        response = JsonResponse({"success": False, "message": str(e)}, status=429)
+        response["Retry-After"] = "30"
+        return response
+
+    content_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    filename = f"game_results.{fmt}" + (".gz" if gzip else "")
+    response = StreamingHttpResponse(
+        stream,
+        content_type="application/gzip" if gzip else content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_leaderboard_team_rank(request, team_no):
+    """
+    Get a team's rank on the leaderboard
+    A team is one AppUser (team_no is unique), so its rank is that user's rank
+    """
+    try:
+        user = AppUser.objects.filter(team_no=team_no).values("id").first()
+        if user is None:
+            return Response({"success": False, "message": "Team not found"}, status=404)
+
+        entry = leaderboard.rank(user["id"])
+        if entry is None:
+            return Response(
+                {"success": False, "message": "No results for this team"}, status=404
+            )
+        return Response({"success": True, "data": _with_teams([entry])[0]})
+
+    except Exception as e:
+        return Response({"success": False, "message": str(e)}, status=500)
@@ -0,0 +1,18 @@
+from django.http import JsonResponse
+
+from .game_results_buffer import game_results_buffer
+from .otp_gateway import otp_gateway
+from .password_workers import password_pool, verified_credentials
+from .session_cache import session_cache
+
+
+def metrics(request):
+    return JsonResponse(
+        {
+            "game_results_buffer": game_results_buffer.metrics(),
+            "session_cache": session_cache.metrics(),
+            "password_pool": password_pool.metrics(),
+            "verified_credentials": verified_credentials.metrics(),
+            "otp_gateway": otp_gateway.metrics(),
+        }
+    )
@@ -1,30 +1,105 @@
 # hackathon/views_vocab.py
-from django.http import JsonResponse
-from django.db import connections
 import random
 
+from django.http import JsonResponse
+
+from .views import _get_session
+from .vocab_pool import DIFFICULTY_LENGTHS, difficulty_for_length, vocab_pool
+from .vocab_sessions import vocab_sequencer
+
+
+ROUND_TIME_SECONDS = 60
+MAX_BATCH_SIZE = 50
+
+
+def _scramble(word: str) -> str:
+    letters = list(word)
+    if len(set(letters)) < 2:
+        return word
+    while True:
+        random.shuffle(letters)
+        scrambled = "".join(letters)
+        if scrambled != word:
+            return scrambled
+
+
+def _word_filters(request) -> dict:
+    filters = {}
+    for name in ("min_len", "max_len"):
+        raw = request.GET.get(name)
+        if raw:
+            filters[name] = int(raw)
+    difficulty = (request.GET.get("difficulty") or "").strip().lower()
+    if difficulty:
+        if difficulty not in DIFFICULTY_LENGTHS:
+            raise ValueError(
+                f"difficulty must be one of {', '.join(DIFFICULTY_LENGTHS)}"
+            )
+        filters["difficulty"] = difficulty
+    return filters
+
+
+def _pick_words(request, n: int, filters: dict) -> list[str]:
+    # Signed-in players get words they have not seen yet this session.
+    session = _get_session(request)
+    if session is not None:
+        return vocab_sequencer.next_words(session.token_hash, n, **filters)
+    return vocab_pool.sample(n, **filters)
+
 
 def next_vocab_word(request):
-    with connections["student"].cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT anchor_word
-            FROM vocab_words
-            ORDER BY RAND()
-            LIMIT 1;
-
-            """
-        )
-        row = cursor.fetchone()
+    try:
+        filters = _word_filters(request)
+    except ValueError as e:
+        return JsonResponse({"detail": f"Invalid filter: {str(e)}"}, status=400)
 
-    if not row:
+    words = _pick_words(request, 1, filters)
+
+    if not words:
         return JsonResponse({"detail": "No words found"}, status=404)
 
-    anchor_word = row[0]
+    anchor_word = words[0]
 
     return JsonResponse(
         {
             "anchor_word": anchor_word,
-            "round_time_seconds": 60,
+            "round_time_seconds": ROUND_TIME_SECONDS,
+        }
+    )
+
+
+def vocab_batch(request):
+    try:
+        n = int(request.GET.get("n") or 10)
+    except ValueError:
+        return JsonResponse({"detail": "n must be an integer"}, status=400)
+
+    try:
+        filters = _word_filters(request)
+    except ValueError as e:
+        return JsonResponse({"detail": f"Invalid filter: {str(e)}"}, status=400)
+
+    if n < 1 or n > MAX_BATCH_SIZE:
+        return JsonResponse(
+            {"detail": f"n must be between 1 and {MAX_BATCH_SIZE}"}, status=400
+        )
+
+    words = _pick_words(request, n, filters)
+    if not words:
+        return JsonResponse({"detail": "No words found"}, status=404)
+
+    return JsonResponse(
+        {
+            "words": [
+                {
+                    "anchor_word": word,
+                    "scrambled": _scramble(word),
+                    "word_length": len(word),
+                    "difficulty": difficulty_for_length(len(word)),
+                    "round_time_seconds": ROUND_TIME_SECONDS,
+                }
+                for word in words
+            ],
+            "count": len(words),
         }
     )
@@ -0,0 +1,226 @@
+import itertools
+import os
+import random
+import threading
+import time
+
+from django.db import connections
+
+from .replicas import replica_selector
+
+
+VOCAB_POOL_REFRESH_SECONDS = int(os.getenv("VOCAB_POOL_REFRESH_SECONDS") or 300)
+
+# Word length ranges (inclusive) for each difficulty level.
+DIFFICULTY_LENGTHS = {
+    "easy": (1, 6),
+    "medium": (7, 9),
+    "hard": (10, 128),
+}
+
+
+def difficulty_for_length(length: int) -> str:
+    for difficulty, (low, high) in DIFFICULTY_LENGTHS.items():
+        if low <= length <= high:
+            return difficulty
+    return "hard"
+
+
+def length_range(
+    min_len: int | None = None,
+    max_len: int | None = None,
+    difficulty: str | None = None,
+) -> tuple[int, int]:
+    low, high = 1, 128
+    if difficulty is not None:
+        if difficulty not in DIFFICULTY_LENGTHS:
+            raise ValueError(f"Unknown difficulty: {difficulty!r}")
+        low, high = DIFFICULTY_LENGTHS[difficulty]
+    if min_len is not None:
+        low = max(low, min_len)
+    if max_len is not None:
+        high = min(high, max_len)
+    return low, high
+
+
+def _fetch_all_words(alias: str) -> list[str]:
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT anchor_word
+            FROM vocab_words
+            """
+        )
+        return [row[0] for row in cursor.fetchall() if row[0]]
+
+
+def _fetch_random_word(alias: str, low: int, high: int) -> str | None:
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT anchor_word
+            FROM vocab_words
+            WHERE CHAR_LENGTH(anchor_word) BETWEEN %s AND %s
+            ORDER BY RAND()
+            LIMIT 1;
+            """,
+            [low, high],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+_index_generations = itertools.count(1)
+
+
+class VocabIndex:
+    """Words bucketed by length.
+
+    A word's id is its position in ``words`` and never changes once assigned,
+    so new words can be appended without touching existing buckets. Lookups
+    only walk the (few dozen at most) distinct lengths, never the words.
+    """
+
+    def __init__(self, words: list[str] | None = None):
+        self.generation = next(_index_generations)
+        self.words: list[str] = []
+        self.ids: dict[str, int] = {}
+        self.by_length: dict[int, list[int]] = {}
+        if words:
+            self.add_words(words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add_words(self, words) -> int:
+        # Readers iterate by_length without a lock, so a new length gets a
+        # new dict swapped in rather than a key added to the live one.
+        # Appending to an existing bucket list is safe for them.
+        by_length = self.by_length
+        new_lengths: dict[int, list[int]] = {}
+        added = 0
+        for word in words:
+            if not word or word in self.ids:
+                continue
+            word_id = len(self.words)
+            self.words.append(word)
+            self.ids[word] = word_id
+            bucket = by_length.get(len(word))
+            if bucket is None:
+                bucket = new_lengths.setdefault(len(word), [])
+            bucket.append(word_id)
+            added += 1
+        if new_lengths:
+            self.by_length = {**by_length, **new_lengths}
+        return added
+
+    def buckets(self, low: int, high: int) -> list[list[int]]:
+        return [
+            bucket
+            for length, bucket in self.by_length.items()
+            if low <= length <= high and bucket
+        ]
+
+    @staticmethod
+    def id_at(buckets: list[list[int]], offset: int) -> int:
+        for bucket in buckets:
+            if offset < len(bucket):
+                return bucket[offset]
+            offset -= len(bucket)
+        raise IndexError(offset)
+
+    def random_id(self, low: int, high: int) -> int | None:
+        buckets = self.buckets(low, high)
+        total = sum(len(bucket) for bucket in buckets)
+        if not total:
+            return None
+        return self.id_at(buckets, random.randrange(total))
+
+    def sample_ids(self, n: int, low: int, high: int) -> list[int]:
+        buckets = self.buckets(low, high)
+        total = sum(len(bucket) for bucket in buckets)
+        offsets = random.sample(range(total), min(n, total))
+        return [self.id_at(buckets, offset) for offset in offsets]
+
+
+class VocabPool:
+    """Process-local copy of ``vocab_words``.
+
+    The table is loaded once and served from memory; it is reloaded when it is
+    older than ``refresh_seconds`` or after ``invalidate()`` bumps the version.
+    While a reload is running other threads keep serving the previous words.
+    """
+
+    def __init__(self, refresh_seconds: int = VOCAB_POOL_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._index = VocabIndex()
+        self._loaded_at = 0.0
+        self._loaded_version = -1
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._version += 1
+
+    def _is_stale(self) -> bool:
+        if self._loaded_version != self._version:
+            return True
+        return time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def _refresh(self) -> None:
+        # Only one thread reloads; the rest return immediately and use what
+        # is already loaded (or fall back to the DB when nothing is).
+        if not self._lock.acquire(blocking=not len(self._index)):
+            return
+        try:
+            if not self._is_stale():
+                return
+            version = self._version
+            try:
+                words = replica_selector.run_read(_fetch_all_words)
+            except Exception as exc:
+                print(f"Error loading vocab pool: {str(exc)}")
+                return
+
+            index = self._index
+            if index.ids.keys() <= set(words):
+                # Words were only added: extend the buckets in place.
+                index.add_words(words)
+            else:
+                self._index = VocabIndex(words)
+            self._loaded_at = time.monotonic()
+            self._loaded_version = version
+        finally:
+            self._lock.release()
+
+    def index(self) -> VocabIndex:
+        if self._is_stale():
+            self._refresh()
+        return self._index
+
+    def add_words(self, words) -> int:
+        with self._lock:
+            return self._index.add_words(words)
+
+    def random_word(self, **filters) -> str | None:
+        low, high = length_range(**filters)
+        index = self.index()
+        if not len(index):
+            return replica_selector.run_read(
+                lambda alias: _fetch_random_word(alias, low, high)
+            )
+        word_id = index.random_id(low, high)
+        return index.words[word_id] if word_id is not None else None
+
+    def sample(self, n: int, **filters) -> list[str]:
+        low, high = length_range(**filters)
+        index = self.index()
+        if not len(index):
+            word = replica_selector.run_read(
+                lambda alias: _fetch_random_word(alias, low, high)
+            )
+            return [word] if word else []
+        return [index.words[word_id] for word_id in index.sample_ids(n, low, high)]
+
+
+vocab_pool = VocabPool()
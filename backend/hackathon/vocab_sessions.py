@@ -0,0 +1,120 @@
+import itertools
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from .vocab_pool import VocabIndex, length_range, vocab_pool
+
+
+VOCAB_SESSION_LIMIT = int(os.getenv("VOCAB_SESSION_LIMIT") or 20000)
+
+# Random probes before falling back to a scan for the remaining unseen words.
+_RANDOM_PROBES = 8
+
+
+class SeenSet:
+    """Bitset of word ids already served to one session."""
+
+    __slots__ = ("generation", "bits")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.bits = bytearray()
+
+    def __contains__(self, word_id: int) -> bool:
+        byte = word_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (word_id & 7)))
+
+    def add(self, word_id: int) -> None:
+        byte = word_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (word_id & 7)
+
+    def discard(self, word_id: int) -> None:
+        byte = word_id >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (word_id & 7)) & 0xFF
+
+
+class VocabSequencer:
+    """Serves each session (keyed by token hash) words it has not seen yet.
+
+    Once every word matching the requested filters has been served, the seen
+    bits for those words are cleared and the cycle starts again. Sessions are
+    kept in LRU order and the least recently used ones are dropped beyond
+    ``max_sessions``.
+    """
+
+    def __init__(self, max_sessions: int = VOCAB_SESSION_LIMIT):
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, SeenSet] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seen_for(self, session_key: str, index: VocabIndex) -> SeenSet:
+        seen = self._sessions.get(session_key)
+        if seen is None or seen.generation != index.generation:
+            # Ids are only stable within one index; a full rebuild resets.
+            seen = SeenSet(index.generation)
+            self._sessions[session_key] = seen
+        self._sessions.move_to_end(session_key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return seen
+
+    @staticmethod
+    def _pick(seen: SeenSet, buckets: list[list[int]], total: int) -> int | None:
+        for _ in range(_RANDOM_PROBES):
+            word_id = VocabIndex.id_at(buckets, random.randrange(total))
+            if word_id not in seen:
+                return word_id
+
+        # Walk forward from a random offset to the first unseen id. Served ids
+        # are spread at random, so the walk is short until very few are left.
+        start = random.randrange(total)
+        ids = itertools.chain(
+            itertools.islice(itertools.chain.from_iterable(buckets), start, None),
+            itertools.islice(itertools.chain.from_iterable(buckets), start),
+        )
+        for word_id in ids:
+            if word_id not in seen:
+                return word_id
+        return None
+
+    def next_words(self, session_key: str, n: int = 1, **filters) -> list[str]:
+        low, high = length_range(**filters)
+        index = vocab_pool.index()
+        if not len(index):
+            return vocab_pool.sample(n, **filters)
+
+        buckets = index.buckets(low, high)
+        total = sum(len(bucket) for bucket in buckets)
+        chosen: list[int] = []
+        with self._lock:
+            seen = self._seen_for(session_key, index)
+            for _ in range(min(n, total)):
+                word_id = self._pick(seen, buckets, total)
+                if word_id is None:
+                    # Every matching word has been served: start a new cycle,
+                    # keeping this call's words so one batch has no repeats.
+                    for bucket in buckets:
+                        for bucket_id in bucket:
+                            seen.discard(bucket_id)
+                    for chosen_id in chosen:
+                        seen.add(chosen_id)
+                    word_id = self._pick(seen, buckets, total)
+                seen.add(word_id)
+                chosen.append(word_id)
+        return [index.words[word_id] for word_id in chosen]
+
+    def forget(self, session_key: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_key, None)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(len(seen.bits) for seen in self._sessions.values())
+
+
+vocab_sequencer = VocabSequencer()
@@ -1,3 +1,4 @@
+import { useState } from 'react'
 import { useLocation, useNavigate } from 'react-router-dom'
 import '../styles/GamePage.css'
 
@@ -12,6 +13,9 @@ function ExitSummaryPage() {
     tasksCompleted = 0,
   } = location.state || {}
 
+  // Same key for every retry of this summary so the server saves it once
+  const [resultId] = useState(() => crypto.randomUUID())
+
   const handleBackToWelcome = () => {
     navigate('/welcome', { replace: true })
   }
@@ -32,6 +36,7 @@ function ExitSummaryPage() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': resultId,
         },
         body: JSON.stringify({
           user_id: userId,